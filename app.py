@@ -7,6 +7,21 @@ import re
 import sys
 import shutil
 import time
+import queue
+import asyncio
+import codecs
+import sqlite3
+import struct
+import zlib
+import hashlib
+import atexit
+import urllib.parse
+import mimetypes
+import multiprocessing
+from collections import OrderedDict, deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, as_completed
+from concurrent.futures.process import BrokenProcessPool
 import yt_dlp
 from flask import (
     Flask,
@@ -17,6 +32,7 @@ from flask import (
     Response,
     stream_with_context,
 )
+from werkzeug.wsgi import ClosingIterator
 
 app = Flask(__name__)
 app.config["DOWNLOAD_FOLDER"] = os.path.join(
@@ -26,18 +42,111 @@ app.config["MAX_CONTENT_LENGTH"] = 500 * 1024 * 1024
 
 os.makedirs(app.config["DOWNLOAD_FOLDER"], exist_ok=True)
 
-download_progress = {}
-download_queue = []
 discover_tasks = {}
+direct_jobs = {}
 app_settings = {
     "concurrent_downloads": 1,
     "default_quality": "best",
     "default_format": "mp4",
+    "extractor_mode": "pool",
+    "progress_interval": 0.5,
+    "partial_max_age_hours": 72,
+    "duplicate_action": "link",
+    "fragment_concurrency": 4,
+    "max_connections": 16,
+    "bandwidth_limit": 0,
+    "execution_mode": "thread",
+    "audio_format": "mp3",
+    "video_container": "mp4",
 }
 
 YT_DLP_EXE = "yt-dlp"
-queue_lock = threading.Lock()
-processing_queue = False
+queue_lock = threading.RLock()
+output_names_lock = threading.Lock()
+reserved_output_names = {}
+progress_aggregators_lock = threading.Lock()
+progress_aggregators = {}
+worker_events = None
+worker_rates = None
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+METADATA_CACHE_DB = os.path.join(APP_DIR, "metadata_cache.db")
+JOB_STORE_DB = os.path.join(APP_DIR, "jobs.db")
+ARCHIVE_DB = os.path.join(APP_DIR, "archive.db")
+SETTINGS_NUMBERS = {
+    "concurrent_downloads": int,
+    "progress_interval": float,
+    "partial_max_age_hours": int,
+    "fragment_concurrency": int,
+    "max_connections": int,
+    "bandwidth_limit": int,
+}
+DUPLICATE_ACTIONS = ("link", "skip", "download")
+JOB_STORE_FLUSH_INTERVAL = 1.0
+METADATA_CACHE_TTL = 30 * 60
+METADATA_CACHE_MEMORY_ENTRIES = 256
+METADATA_CACHE_DISK_ENTRIES = 5000
+PROCESS_READ_CHUNK = 64 * 1024
+PROCESS_LINE_BREAK = re.compile(r"[\r\n]")
+PROCESS_STOP_POLL_INTERVAL = 1.0
+QUEUE_STATUSES = ("pending", "downloading", "processing", "completed", "error")
+QUEUE_ACTIVE_STATUSES = ("pending", "downloading", "processing")
+QUEUE_TOMBSTONE_LIMIT = 1000
+EVENT_BUFFER_SIZE = 10000
+EVENT_KEEPALIVE_INTERVAL = 15
+DISCOVER_BATCH_SIZE = 100
+DISCOVER_ENRICH_WORKERS = 4
+DISCOVER_CANCEL_GRACE = 10
+INFO_BATCH_PARALLELISM = 4
+INFO_BATCH_MAX_PARALLELISM = 16
+INFO_BATCH_MAX_URLS = 500
+QUEUE_BULK_MAX_ITEMS = 5000
+PROGRESS_SPEED_HALF_LIFE = 3.0
+PROGRESS_SAMPLE_MIN_INTERVAL = 0.1
+PLAYLIST_ENTRY_RETRIES = 2
+PLAYLIST_RETRY_BACKOFF = 2
+PARTIAL_SUFFIX = re.compile(r"\.(?:part(?:-Frag\d+(?:\.part)?)?|ytdl)$")
+PARTIAL_STEM = re.compile(r"(?:\.f[\w-]+)?\.\w+")
+PARTIAL_GC_INTERVAL = 60 * 60
+MAX_FRAGMENT_CONCURRENCY = 16
+MAX_TOTAL_CONNECTIONS = 64
+BANDWIDTH_BLOCK_SIZE = 128 * 1024
+BANDWIDTH_BURST_SECONDS = 1.0
+BANDWIDTH_MAX_SLEEP = 1.0
+BANDWIDTH_IDLE_TIMEOUT = 2.0
+BANDWIDTH_REBALANCE_INTERVAL = 0.5
+POSTPROCESS_WORKERS = os.cpu_count() or 2
+PROGRESSIVE_PROTOCOLS = ("http", "https")
+PROGRESSIVE_CHUNK_SIZE = 256 * 1024
+PROGRESSIVE_POLL_INTERVAL = 0.25
+ARCHIVE_CRC_CACHE_ENTRIES = 4096
+PLAYLIST_ARCHIVE_ENTRIES = 256
+AUDIO_FORMATS = {
+    "best": ("bestaudio/best", ()),
+    "mp3": ("bestaudio[acodec=mp3]/bestaudio/best", ("mp3",)),
+    "m4a": ("bestaudio[ext=m4a]/bestaudio[acodec^=mp4a]/bestaudio/best", ("aac", "mp4a")),
+    "opus": ("bestaudio[acodec=opus]/bestaudio/best", ("opus",)),
+    "vorbis": ("bestaudio[acodec=vorbis]/bestaudio/best", ("vorbis",)),
+    "flac": ("bestaudio[acodec=flac]/bestaudio/best", ("flac",)),
+    "wav": ("bestaudio/best", ("pcm",)),
+}
+VIDEO_CONTAINERS = {
+    "mp4": "mp4",
+    "mkv": "mkv",
+    "webm": "webm/mkv",
+    "original": None,
+}
+EXECUTION_MODES = ("thread", "process")
+PROCESS_WORKER_MAX_JOBS = 20
+PROCESS_RATE_SLOTS = 16
+EXTRACTOR_POOL_SIZE = 4
+EXTRACTOR_MAX_USES = 50
+EXTRACTOR_OPTIONS = {
+    "quiet": True,
+    "no_warnings": True,
+    "skip_download": True,
+    "socket_timeout": 30,
+}
 
 
 def get_default_download_path():
@@ -53,26 +162,137 @@ def get_download_folder():
     return app.config["DOWNLOAD_FOLDER"]
 
 
-def check_ffmpeg():
-    local_ffmpeg = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), "bin", "ffmpeg", "bin", "ffmpeg.exe"
-    )
-    if os.path.exists(local_ffmpeg):
-        return True
-    return shutil.which("ffmpeg") is not None
+TOOLCHAIN_PROBE_TIMEOUT = 15
+TOOLCHAIN_ENCODERS = (
+    "libx264", "libx265", "libvpx-vp9", "libaom-av1", "aac", "libfdk_aac",
+    "libmp3lame", "libopus", "libvorbis", "flac",
+    "h264_nvenc", "hevc_nvenc", "h264_qsv", "hevc_qsv",
+    "h264_vaapi", "hevc_vaapi", "h264_videotoolbox", "hevc_videotoolbox", "h264_amf",
+)
 
 
-def get_ffmpeg_location():
+def run_probe(cmd):
+    try:
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=TOOLCHAIN_PROBE_TIMEOUT,
+            encoding="utf-8",
+            errors="replace",
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def find_ffmpeg():
     local_ffmpeg_dir = os.path.join(
         os.path.dirname(os.path.abspath(__file__)), "bin", "ffmpeg", "bin"
     )
-    if os.path.exists(os.path.join(local_ffmpeg_dir, "ffmpeg.exe")):
-        return local_ffmpeg_dir
-    return None
+    for name in ("ffmpeg.exe", "ffmpeg"):
+        local_ffmpeg = os.path.join(local_ffmpeg_dir, name)
+        if os.path.exists(local_ffmpeg):
+            return local_ffmpeg
+    return shutil.which("ffmpeg")
+
+
+def probe_ffmpeg():
+    path = find_ffmpeg()
+    tool = {"available": False, "path": path, "location": None, "version": None,
+            "ffprobe": None, "encoders": [], "hwaccels": []}
+    if not path:
+        return tool
+
+    tool["available"] = True
+    tool["location"] = os.path.dirname(path)
+    for name in ("ffprobe.exe", "ffprobe"):
+        if os.path.exists(os.path.join(tool["location"], name)):
+            tool["ffprobe"] = os.path.join(tool["location"], name)
+            break
+    else:
+        tool["ffprobe"] = shutil.which("ffprobe")
+
+    output = run_probe([path, "-hide_banner", "-version"])
+    if output:
+        match = re.match(r"\S+ version (\S+)", output)
+        tool["version"] = match.group(1) if match else output.splitlines()[0]
+
+    output = run_probe([path, "-hide_banner", "-encoders"]) or ""
+    available = {line.split()[1] for line in output.splitlines() if len(line.split()) > 1}
+    tool["encoders"] = [name for name in TOOLCHAIN_ENCODERS if name in available]
+
+    output = run_probe([path, "-hide_banner", "-hwaccels"]) or ""
+    tool["hwaccels"] = [
+        line.strip() for line in output.splitlines()[1:] if line.strip()
+    ]
+    return tool
+
+
+def probe_ytdlp():
+    path = shutil.which(YT_DLP_EXE)
+    tool = {
+        "available": path is not None,
+        "path": path,
+        "version": None,
+        "module_version": yt_dlp.version.__version__,
+        "concurrent_fragments": False,
+        "aria2c": shutil.which("aria2c"),
+    }
+    if not path:
+        return tool
+
+    output = run_probe([path, "--version"])
+    if output:
+        tool["version"] = output.strip()
+    tool["concurrent_fragments"] = "--concurrent-fragments" in (run_probe([path, "--help"]) or "")
+    return tool
+
+
+class Toolchain:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tools = None
+        self.probed_at = None
+
+    def refresh(self):
+        tools = {"ffmpeg": probe_ffmpeg(), "yt-dlp": probe_ytdlp()}
+        with self.lock:
+            self.tools = tools
+            self.probed_at = time.time()
+        return tools
+
+    def load(self, tools):
+        with self.lock:
+            self.tools = tools
+
+    def get(self):
+        with self.lock:
+            tools = self.tools
+        return tools if tools is not None else self.refresh()
+
+    def get_stats(self):
+        tools = self.get()
+        return dict(tools, probed_at=self.probed_at)
+
+
+toolchain = Toolchain()
+
+
+def check_ffmpeg():
+    return toolchain.get()["ffmpeg"]["available"]
+
+
+def get_ffmpeg_location():
+    return toolchain.get()["ffmpeg"]["location"]
 
 
 def check_ytdlp():
-    return shutil.which("yt-dlp") is not None
+    return toolchain.get()["yt-dlp"]["available"]
+
+
+def get_ytdlp_executable():
+    return toolchain.get()["yt-dlp"]["path"] or YT_DLP_EXE
 
 
 def format_duration(seconds):
@@ -95,8 +315,1010 @@ def sanitize_filename(title):
     return title
 
 
+def get_canonical_video_id(url):
+    parsed = urllib.parse.urlparse(url.strip())
+    host = parsed.netloc.lower()
+    query = urllib.parse.parse_qs(parsed.query)
+
+    if host.endswith("youtu.be"):
+        video_id = parsed.path.strip("/").split("/")[0]
+        if video_id:
+            return f"youtube:{video_id}"
+
+    if "youtube.com" in host:
+        if query.get("v"):
+            return f"youtube:{query['v'][0]}"
+        match = re.match(r"^/(?:shorts|embed|live|v)/([\w-]+)", parsed.path)
+        if match:
+            return f"youtube:{match.group(1)}"
+
+    return None
+
+
+def get_canonical_playlist_id(url):
+    parsed = urllib.parse.urlparse(url.strip())
+    host = parsed.netloc.lower()
+    query = urllib.parse.parse_qs(parsed.query)
+
+    if ("youtube.com" in host or host.endswith("youtu.be")) and query.get("list"):
+        return f"youtube:list:{query['list'][0]}"
+
+    return None
+
+
+def get_canonical_url_key(url):
+    parsed = urllib.parse.urlparse(url.strip())
+    return "url:" + urllib.parse.urlunparse(parsed._replace(fragment=""))
+
+
+class MetadataCache:
+    def __init__(self, db_path, ttl, memory_entries, disk_entries):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+        }
+        self.db = None
+        try:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self.db.commit()
+        except sqlite3.Error:
+            self.db = None
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self.memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return value
+                del self.memory[key]
+                self.stats["expired"] += 1
+
+            if self.db is not None:
+                try:
+                    row = self.db.execute(
+                        "SELECT value, expires_at FROM metadata WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and row[1] > now:
+                        self.db.execute(
+                            "UPDATE metadata SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self.db.commit()
+                        value = json.loads(row[0])
+                        self._remember(key, row[1], value)
+                        self.stats["disk_hits"] += 1
+                        return value
+                    if row:
+                        self.db.execute("DELETE FROM metadata WHERE key = ?", (key,))
+                        self.db.commit()
+                        self.stats["expired"] += 1
+                except (sqlite3.Error, ValueError):
+                    pass
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+        with self.lock:
+            self._remember(key, expires_at, value)
+            if self.db is None:
+                return
+            try:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO metadata (key, value, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, now),
+                )
+                self.db.execute("DELETE FROM metadata WHERE expires_at <= ?", (now,))
+                count = self.db.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+                if count > self.disk_entries:
+                    self.db.execute(
+                        "DELETE FROM metadata WHERE key IN ("
+                        "SELECT key FROM metadata ORDER BY accessed_at LIMIT ?)",
+                        (count - self.disk_entries,),
+                    )
+                    self.stats["evictions"] += count - self.disk_entries
+                self.db.commit()
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.db is not None:
+                try:
+                    self.db.execute("DELETE FROM metadata")
+                    self.db.commit()
+                except sqlite3.Error:
+                    pass
+
+    def get_stats(self):
+        with self.lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            lookups = hits + self.stats["misses"]
+            disk_entries = 0
+            if self.db is not None:
+                try:
+                    disk_entries = self.db.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {
+                **self.stats,
+                "hits": hits,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0,
+                "memory_entries": len(self.memory),
+                "disk_entries": disk_entries,
+                "ttl": self.ttl,
+            }
+
+    def _remember(self, key, expires_at, value):
+        self.memory[key] = (expires_at, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+
+metadata_cache = MetadataCache(
+    METADATA_CACHE_DB,
+    METADATA_CACHE_TTL,
+    METADATA_CACHE_MEMORY_ENTRIES,
+    METADATA_CACHE_DISK_ENTRIES,
+)
+
+
+class ExtractorPool:
+    def __init__(self, size, max_uses, options):
+        self.size = size
+        self.max_uses = max_uses
+        self.options = options
+        self.lock = threading.Lock()
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.stats = {"created": 0, "recycled": 0, "errors": 0, "calls": 0}
+
+    def warm(self):
+        while True:
+            with self.lock:
+                if self.created >= self.size:
+                    return
+                self.created += 1
+            try:
+                self.idle.put(self._new_slot())
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                return
+
+    def extract_info(self, url, timeout=120, **overrides):
+        # timeout bounds the whole call: waiting for an extractor plus the extraction
+        deadline = time.monotonic() + timeout
+        slot = self._acquire(timeout)
+        slot["released"] = False
+        ydl = slot["ydl"]
+        saved = {key: ydl.params.get(key) for key in overrides}
+        ydl.params.update(overrides)
+        outcome = {}
+
+        def run():
+            failed = False
+            try:
+                outcome["info"] = ydl.extract_info(url, download=False)
+            except Exception as e:
+                failed = True
+                outcome["error"] = e
+            finally:
+                ydl.params.update(saved)
+                self._release(slot, failed)
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        worker.join(max(0, deadline - time.monotonic()))
+        if worker.is_alive() and self._abandon(slot):
+            raise TimeoutError(f"Extraction timed out after {timeout}s")
+        worker.join()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome.get("info")
+
+    def expand(self, extra):
+        # Batch lookups bring their own slots rather than queueing behind the shared ones
+        with self.lock:
+            self.size += extra
+
+    def shrink(self, extra):
+        with self.lock:
+            self.size -= extra
+        while True:
+            with self.lock:
+                if self.created <= self.size:
+                    return
+                try:
+                    slot = self.idle.get_nowait()
+                except queue.Empty:
+                    return
+                self.created -= 1
+                self.stats["recycled"] += 1
+            try:
+                slot["ydl"].close()
+            except Exception:
+                pass
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                **self.stats,
+                "size": self.size,
+                "max_uses": self.max_uses,
+                "live": self.created,
+                "idle": self.idle.qsize(),
+            }
+
+    def _new_slot(self):
+        ydl = yt_dlp.YoutubeDL(dict(self.options))
+        with self.lock:
+            self.stats["created"] += 1
+        return {"ydl": ydl, "uses": 0}
+
+    def _acquire(self, timeout):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            create = self.created < self.size
+            if create:
+                self.created += 1
+        if create:
+            try:
+                return self._new_slot()
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                raise
+        return self.idle.get(timeout=timeout)
+
+    def _abandon(self, slot):
+        # A hung extraction cannot be interrupted; give its place in the pool to a fresh
+        # instance and let the stuck one be closed whenever it returns
+        with self.lock:
+            if slot.get("released"):
+                return False
+            slot["abandoned"] = True
+            self.created -= 1
+            self.stats["calls"] += 1
+            self.stats["errors"] += 1
+            self.stats["recycled"] += 1
+            return True
+
+    def _release(self, slot, failed):
+        slot["uses"] += 1
+        with self.lock:
+            slot["released"] = True
+            if slot.get("abandoned"):
+                recycle = True
+            else:
+                self.stats["calls"] += 1
+                if failed:
+                    self.stats["errors"] += 1
+                recycle = failed or slot["uses"] >= self.max_uses or self.created > self.size
+                if recycle:
+                    self.created -= 1
+                    self.stats["recycled"] += 1
+        if not recycle:
+            self.idle.put(slot)
+            return
+        try:
+            slot["ydl"].close()
+        except Exception:
+            pass
+
+
+extractor_pool = ExtractorPool(EXTRACTOR_POOL_SIZE, EXTRACTOR_MAX_USES, EXTRACTOR_OPTIONS)
+
+
+def get_archive_key(info):
+    extractor = info.get("extractor_key") or info.get("ie_key")
+    if not extractor or not info.get("id"):
+        return None
+    return f"{extractor.lower()}:{info['id']}"
+
+
+def get_archive_mode(format_id, audio_only, audio_format=None, container=None):
+    if audio_only:
+        return f"audio:{audio_format if audio_format in AUDIO_FORMATS else app_settings['audio_format']}"
+    container = container if container in VIDEO_CONTAINERS else app_settings["video_container"]
+    return f"video:{format_id or 'best'}:{container}"
+
+
+class DownloadArchive:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "linked": 0, "misses": 0, "stale": 0}
+        self.db = None
+        try:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS archive ("
+                "video_key TEXT NOT NULL, mode TEXT NOT NULL, filepath TEXT NOT NULL, "
+                "title TEXT, size INTEGER, added_at REAL NOT NULL, "
+                "PRIMARY KEY (video_key, mode)) WITHOUT ROWID"
+            )
+            self.db.commit()
+        except sqlite3.Error:
+            self.db = None
+
+    def get(self, video_key, mode):
+        if self.db is None or not video_key:
+            return None
+        with self.lock:
+            try:
+                row = self.db.execute(
+                    "SELECT filepath, title, size FROM archive WHERE video_key = ? AND mode = ?",
+                    (video_key, mode),
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            if not os.path.exists(row[0]):
+                self.db.execute(
+                    "DELETE FROM archive WHERE video_key = ? AND mode = ?", (video_key, mode)
+                )
+                self.db.commit()
+                self.stats["stale"] += 1
+                return None
+            self.stats["hits"] += 1
+            return {"filepath": row[0], "title": row[1], "size": row[2]}
+
+    def add(self, video_key, mode, filepath, title=None):
+        if self.db is None or not video_key:
+            return
+        with self.lock:
+            try:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO archive (video_key, mode, filepath, title, size, added_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (video_key, mode, filepath, title, os.path.getsize(filepath), time.time()),
+                )
+                self.db.commit()
+            except (sqlite3.Error, OSError):
+                pass
+
+    def resolve(self, video_key, mode, download_path):
+        if app_settings["duplicate_action"] == "download":
+            return None
+        entry = self.get(video_key, mode)
+        if entry is None:
+            return None
+
+        source = entry["filepath"]
+        if app_settings["duplicate_action"] == "skip":
+            return source
+        if os.path.abspath(os.path.dirname(source)) == os.path.abspath(download_path):
+            return source
+
+        target = os.path.join(download_path, os.path.basename(source))
+        if os.path.exists(target):
+            return target
+        try:
+            os.makedirs(download_path, exist_ok=True)
+            os.link(source, target)
+        except OSError:
+            return source
+        with self.lock:
+            self.stats["linked"] += 1
+        return target
+
+    def clear(self):
+        with self.lock:
+            if self.db is None:
+                return
+            try:
+                self.db.execute("DELETE FROM archive")
+                self.db.commit()
+            except sqlite3.Error:
+                pass
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            if self.db is not None:
+                try:
+                    stats["entries"] = self.db.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return stats
+
+
+download_archive = DownloadArchive(ARCHIVE_DB)
+
+
+class JobStore:
+    def __init__(self, db_path, flush_interval):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.dirty_lock = threading.Lock()
+        self.dirty_jobs = set()
+        self.dirty_progress = set()
+        self.dirty_discover = set()
+        # Progress ids taken by a flush stay hidden from read-through until its commit lands
+        self.flushing_progress = set()
+        self.flush_lock = threading.Lock()
+        self.writer = None
+        self.db = None
+        try:
+            self.db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "task_id TEXT PRIMARY KEY, kind TEXT NOT NULL, item TEXT NOT NULL, updated_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS progress ("
+                "task_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS history ("
+                "task_id TEXT PRIMARY KEY, url TEXT, title TEXT, filename TEXT, "
+                "status TEXT NOT NULL, completed_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS discover ("
+                "task_id TEXT PRIMARY KEY, url TEXT, status TEXT NOT NULL, error TEXT, "
+                "videos TEXT NOT NULL, updated_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            )
+        except sqlite3.Error:
+            self.db = None
+
+    def mark_job(self, task_id):
+        self._mark(self.dirty_jobs, task_id)
+
+    def mark_progress(self, task_id):
+        self._mark(self.dirty_progress, task_id)
+
+    def mark_discover(self, task_id):
+        self._mark(self.dirty_discover, task_id)
+
+    def flush(self):
+        with self.flush_lock:
+            with self.dirty_lock:
+                jobs, self.dirty_jobs = self.dirty_jobs, set()
+                progress, self.dirty_progress = self.dirty_progress, set()
+                discover, self.dirty_discover = self.dirty_discover, set()
+                self.flushing_progress = progress
+            try:
+                self._write(jobs, progress, discover)
+            finally:
+                with self.dirty_lock:
+                    self.flushing_progress = set()
+
+    def _write(self, jobs, progress, discover):
+        if self.db is None or not (jobs or progress or discover):
+            return
+
+        now = time.time()
+        job_rows = []
+        progress_rows = []
+        history_rows = []
+        discover_rows = []
+        deleted_jobs = []
+        deleted_progress = []
+
+        for task_id in jobs:
+            item = download_queue.get(task_id) or direct_jobs.get(task_id)
+            if item is None:
+                deleted_jobs.append((task_id,))
+            else:
+                item = dict(item)
+                job_rows.append((task_id, item.get("kind", "queue"), json.dumps(item), now))
+
+        for task_id in progress:
+            record = dict.get(download_progress, task_id)
+            if record is None:
+                deleted_progress.append((task_id,))
+                continue
+            record = dict(record)
+            progress_rows.append((task_id, json.dumps(record), now))
+            if record.get("status") == "completed":
+                item = download_queue.get(task_id) or direct_jobs.get(task_id) or {}
+                history_rows.append(
+                    (task_id, item.get("url"), record.get("title") or item.get("title"), record.get("filename"), "completed", now)
+                )
+
+        for task_id in discover:
+            task = discover_tasks.get(task_id)
+            if task is not None:
+                videos, status, error = task.snapshot()
+                discover_rows.append((task_id, task.url, status, error, json.dumps(videos), now))
+
+        with self.lock:
+            try:
+                self.db.execute("BEGIN")
+                self.db.executemany(
+                    "INSERT INTO jobs (task_id, kind, item, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(task_id) DO UPDATE SET item = excluded.item, updated_at = excluded.updated_at",
+                    job_rows,
+                )
+                self.db.executemany("DELETE FROM jobs WHERE task_id = ?", deleted_jobs)
+                self.db.executemany("INSERT OR REPLACE INTO progress VALUES (?, ?, ?)", progress_rows)
+                self.db.executemany("DELETE FROM progress WHERE task_id = ?", deleted_progress)
+                self.db.executemany("INSERT OR IGNORE INTO history VALUES (?, ?, ?, ?, ?, ?)", history_rows)
+                self.db.executemany("INSERT OR REPLACE INTO discover VALUES (?, ?, ?, ?, ?, ?)", discover_rows)
+                self.db.execute("COMMIT")
+            except sqlite3.Error:
+                try:
+                    self.db.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+
+    def load_jobs(self):
+        rows = self._query("SELECT item FROM jobs ORDER BY rowid")
+        return [json.loads(row[0]) for row in rows]
+
+    def delete_job(self, task_id):
+        self._execute("DELETE FROM jobs WHERE task_id = ?", (task_id,))
+
+    def load_progress(self, task_id):
+        # Read under dirty_lock so a removal cannot be marked between the check and the query
+        with self.dirty_lock:
+            if task_id in self.dirty_progress or task_id in self.flushing_progress:
+                return None
+            rows = self._query("SELECT data FROM progress WHERE task_id = ?", (task_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def load_discover(self, task_id):
+        rows = self._query("SELECT url, status, error, videos FROM discover WHERE task_id = ?", (task_id,))
+        if not rows:
+            return None
+        url, status, error, videos = rows[0]
+        return {"url": url, "status": status, "error": error, "videos": json.loads(videos)}
+
+    def load_history(self, limit=100):
+        rows = self._query(
+            "SELECT task_id, url, title, filename, status, completed_at FROM history "
+            "ORDER BY completed_at DESC LIMIT ?",
+            (limit,),
+        )
+        keys = ("task_id", "url", "title", "filename", "status", "completed_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def load_settings(self):
+        rows = self._query("SELECT key, value FROM settings")
+        return {key: json.loads(value) for key, value in rows}
+
+    def save_settings(self, settings):
+        if self.db is None:
+            return
+        with self.lock:
+            try:
+                self.db.execute("BEGIN")
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO settings VALUES (?, ?)",
+                    [(key, json.dumps(value)) for key, value in settings.items()],
+                )
+                self.db.execute("COMMIT")
+            except sqlite3.Error:
+                try:
+                    self.db.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+
+    def _mark(self, dirty, task_id):
+        if self.db is None:
+            return
+        with self.dirty_lock:
+            dirty.add(task_id)
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._run, daemon=True)
+                self.writer.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _query(self, sql, params=()):
+        if self.db is None:
+            return []
+        with self.lock:
+            try:
+                return self.db.execute(sql, params).fetchall()
+            except sqlite3.Error:
+                return []
+
+    def _execute(self, sql, params=()):
+        if self.db is None:
+            return
+        with self.lock:
+            try:
+                self.db.execute(sql, params)
+            except sqlite3.Error:
+                pass
+
+
+job_store = JobStore(JOB_STORE_DB, JOB_STORE_FLUSH_INTERVAL)
+atexit.register(job_store.flush)
+
+
+class EventHub:
+    def __init__(self, buffer_size):
+        self.changed = threading.Condition()
+        # seq restarts with the process, so SSE ids carry the run they came from
+        self.run_id = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.events = deque(maxlen=buffer_size)
+
+    def cursor(self, seq):
+        return f"{self.run_id}.{seq}"
+
+    def parse(self, cursor):
+        run_id, _, seq = (cursor or "").partition(".")
+        if run_id != self.run_id or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def publish(self, channel, key=None, payload=None):
+        with self.changed:
+            self.seq += 1
+            self.events.append((self.seq, channel, key, payload))
+            self.changed.notify_all()
+            return self.seq
+
+    def read(self, after, timeout):
+        with self.changed:
+            if after is None:
+                # A cursor from another run; none of its history exists here
+                return self.seq, [], True
+            if self.seq <= after:
+                self.changed.wait(timeout)
+            if not self.events or after >= self.seq:
+                return self.seq, [], False
+            first = self.events[0][0]
+            lost = after < first - 1
+            start = max(0, after - first + 1)
+            return self.seq, list(islice(self.events, start, None)), lost
+
+
+event_hub = EventHub(EVENT_BUFFER_SIZE)
+
+
+class ChangeFeed:
+    def __init__(self, tombstone_limit):
+        self.lock = threading.Lock()
+        # Versions restart from zero with the process, so cursors carry the run they came from
+        self.run_id = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.floor = 0
+        self.tombstone_limit = tombstone_limit
+        self.changes = OrderedDict()
+        self.tombstones = OrderedDict()
+
+    def touch(self, key=None):
+        with self.lock:
+            self.version += 1
+            if key is not None:
+                self.changes[key] = self.version
+                self.changes.move_to_end(key)
+            return self.version
+
+    def remove(self, key):
+        with self.lock:
+            self.version += 1
+            self.changes.pop(key, None)
+            self.tombstones[key] = self.version
+            self.tombstones.move_to_end(key)
+            while len(self.tombstones) > self.tombstone_limit:
+                _, version = self.tombstones.popitem(last=False)
+                self.floor = max(self.floor, version)
+            return self.version
+
+    def cursor(self, version):
+        return f"{self.run_id}.{version}"
+
+    def parse(self, cursor):
+        run_id, _, version = (cursor or "").partition(".")
+        if run_id != self.run_id or not version.isdigit():
+            return None
+        return int(version)
+
+    def since(self, version):
+        with self.lock:
+            if version < self.floor or version > self.version:
+                return self.version, None, None
+            changed = []
+            for key, changed_at in reversed(self.changes.items()):
+                if changed_at <= version:
+                    break
+                changed.append(key)
+            removed = []
+            for key, removed_at in reversed(self.tombstones.items()):
+                if removed_at <= version:
+                    break
+                removed.append(key)
+            return self.version, changed, removed
+
+
+queue_feed = ChangeFeed(QUEUE_TOMBSTONE_LIMIT)
+
+
+class ProgressRecord(dict):
+    def __init__(self, task_id, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.task_id = task_id
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        publish_progress(self.task_id)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        publish_progress(self.task_id)
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        publish_progress(self.task_id)
+
+
+class ProgressStore(dict):
+    def get(self, task_id, default=None):
+        record = super().get(task_id)
+        if record is not None:
+            return record
+        data = job_store.load_progress(task_id)
+        if data is None:
+            return default
+        record = ProgressRecord(task_id, data)
+        return super().setdefault(task_id, record)
+
+    def __setitem__(self, task_id, value):
+        super().__setitem__(task_id, ProgressRecord(task_id, value))
+        publish_progress(task_id)
+
+    def __delitem__(self, task_id):
+        super().__delitem__(task_id)
+        publish_progress(task_id)
+
+    def set_many(self, records):
+        # Bulk inserts are announced by the one queue event that adds them, not an event per record
+        for task_id, value in records.items():
+            super().__setitem__(task_id, ProgressRecord(task_id, value))
+            job_store.mark_progress(task_id)
+
+    def pop(self, task_id, *default):
+        value = super().pop(task_id, *default)
+        publish_progress(task_id)
+        return value
+
+    def clear(self):
+        task_ids = list(self)
+        super().clear()
+        for task_id in task_ids:
+            publish_progress(task_id)
+
+
+def publish_progress(task_id):
+    if worker_events is not None:
+        record = dict.get(download_progress, task_id)
+        if record is not None:
+            worker_events.put((task_id, dict(record)))
+        return
+    queue_feed.touch(task_id)
+    job_store.mark_progress(task_id)
+    event_hub.publish("progress", task_id)
+
+
+download_progress = ProgressStore()
+
+
+class DownloadQueue:
+    def __init__(self, lock):
+        self.lock = lock
+        self.items = OrderedDict()
+        self.buckets = {status: OrderedDict() for status in QUEUE_STATUSES}
+        self.active_keys = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.items.values()))
+
+    def __contains__(self, task_id):
+        return task_id in self.items
+
+    def get(self, task_id):
+        return self.items.get(task_id)
+
+    def find_active(self, dedup_key):
+        with self.lock:
+            return self.active_keys.get(dedup_key)
+
+    def add(self, item):
+        with self.lock:
+            self._insert(item)
+            event_hub.publish("queue", item["task_id"])
+            return len(self.items)
+
+    def add_many(self, items):
+        with self.lock:
+            for item in items:
+                self._insert(item)
+            if items:
+                event_hub.publish("queue", None, {"task_ids": [item["task_id"] for item in items]})
+            return len(self.items)
+
+    def _insert(self, item):
+        status = item.setdefault("status", "pending")
+        self.items[item["task_id"]] = item
+        self.buckets[status][item["task_id"]] = item
+        if status in QUEUE_ACTIVE_STATUSES:
+            self.active_keys[get_queue_dedup_key(item)] = item["task_id"]
+        queue_feed.touch(item["task_id"])
+        job_store.mark_job(item["task_id"])
+
+    def set_status(self, task_id, status):
+        with self.lock:
+            item = self.items.get(task_id)
+            if item is None:
+                return None
+            self.buckets[item["status"]].pop(task_id, None)
+            item["status"] = status
+            self.buckets[status][task_id] = item
+            if status not in QUEUE_ACTIVE_STATUSES:
+                self._forget(item)
+            queue_feed.touch(task_id)
+            job_store.mark_job(task_id)
+            event_hub.publish("queue", task_id)
+            return item
+
+    def remove(self, task_id):
+        with self.lock:
+            item = self.items.pop(task_id, None)
+            if item is not None:
+                self.buckets[item["status"]].pop(task_id, None)
+                self._forget(item)
+                queue_feed.remove(task_id)
+                job_store.mark_job(task_id)
+                event_hub.publish("queue", task_id)
+            return item
+
+    def clear(self, statuses=None):
+        with self.lock:
+            if statuses is None:
+                statuses = QUEUE_STATUSES
+            for status in statuses:
+                for task_id in list(self.buckets[status]):
+                    self._forget(self.items.pop(task_id))
+                    queue_feed.remove(task_id)
+                    job_store.mark_job(task_id)
+                    event_hub.publish("queue", task_id)
+                self.buckets[status].clear()
+
+    def next_pending(self):
+        with self.lock:
+            pending = self.buckets["pending"]
+            if not pending:
+                return None
+            task_id = next(iter(pending))
+            return self.set_status(task_id, "downloading")
+
+    def count(self, status):
+        return len(self.buckets[status])
+
+    def counts(self):
+        with self.lock:
+            return {status: len(bucket) for status, bucket in self.buckets.items()}
+
+    def _forget(self, item):
+        dedup_key = get_queue_dedup_key(item)
+        if self.active_keys.get(dedup_key) == item["task_id"]:
+            del self.active_keys[dedup_key]
+
+
+def get_queue_dedup_key(item):
+    url = item.get("url", "")
+    video_key = get_canonical_video_id(url) or get_canonical_url_key(url)
+    return (video_key, get_archive_mode(
+        item.get("format_id"), item.get("audio_only"), item.get("audio_format"), item.get("video_container")
+    ), item.get("download_path"))
+
+
+download_queue = DownloadQueue(queue_lock)
+
+
 def get_video_info_cli(url):
-    cmd = [YT_DLP_EXE, "--dump-json", "--no-download", "--no-playlist", "-q", url]
+    cache_key = "video:" + (get_canonical_video_id(url) or get_canonical_url_key(url))
+    cached = metadata_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    if app_settings["extractor_mode"] == "pool":
+        info = fetch_video_info_pool(url)
+    else:
+        info = fetch_video_info_cli(url)
+    if "error" not in info:
+        metadata_cache.set(cache_key, info)
+    return info
+
+
+def build_video_info(info):
+    formats = []
+    for f in info.get("formats") or []:
+        if f.get("ext") in ["mp4", "webm", "m4a"]:
+            height = f.get("height", 0) or 0
+            formats.append(
+                {
+                    "format_id": f.get("format_id"),
+                    "ext": f.get("ext"),
+                    "resolution": f.get("resolution")
+                    or (
+                        str(f.get("height", "")) + "p"
+                        if f.get("height")
+                        else "audio"
+                    ),
+                    "height": height,
+                    "filesize": f.get("filesize")
+                    or f.get("filesize_approx", 0),
+                    "vcodec": f.get("vcodec", "none"),
+                    "acodec": f.get("acodec", "none"),
+                }
+            )
+
+    formats.sort(key=lambda x: x.get("height", 0), reverse=True)
+
+    unique_formats = []
+    seen_res = set()
+    for f in formats:
+        res = f.get("resolution", "")
+        if res not in seen_res:
+            seen_res.add(res)
+            unique_formats.append(f)
+
+    return {
+        "type": "video",
+        "id": info.get("id"),
+        "title": info.get("title"),
+        "thumbnail": info.get("thumbnail"),
+        "duration": format_duration(info.get("duration")),
+        "formats": unique_formats[:20],
+        "uploader": info.get("uploader"),
+        "view_count": info.get("view_count"),
+    }
+
+
+def build_playlist_entry(entry):
+    return {
+        "id": entry.get("id"),
+        "title": entry.get("title"),
+        "thumbnail": entry.get("thumbnail"),
+        "duration": format_duration(entry.get("duration")),
+    }
+
+
+def fetch_video_info_cli(url):
+    cmd = [get_ytdlp_executable(), "--dump-json", "--no-download", "--no-playlist", "-q", url]
 
     try:
         result = subprocess.run(
@@ -123,48 +1345,7 @@ def get_video_info_cli(url):
                 else:
                     return {"error": "Failed to parse video info"}
 
-            formats = []
-            for f in info.get("formats", []):
-                if f.get("ext") in ["mp4", "webm", "m4a"]:
-                    height = f.get("height", 0) or 0
-                    formats.append(
-                        {
-                            "format_id": f.get("format_id"),
-                            "ext": f.get("ext"),
-                            "resolution": f.get("resolution")
-                            or (
-                                str(f.get("height", "")) + "p"
-                                if f.get("height")
-                                else "audio"
-                            ),
-                            "height": height,
-                            "filesize": f.get("filesize")
-                            or f.get("filesize_approx", 0),
-                            "vcodec": f.get("vcodec", "none"),
-                            "acodec": f.get("acodec", "none"),
-                        }
-                    )
-
-            formats.sort(key=lambda x: x.get("height", 0), reverse=True)
-
-            unique_formats = []
-            seen_res = set()
-            for f in formats:
-                res = f.get("resolution", "")
-                if res not in seen_res:
-                    seen_res.add(res)
-                    unique_formats.append(f)
-
-            return {
-                "type": "video",
-                "id": info.get("id"),
-                "title": info.get("title"),
-                "thumbnail": info.get("thumbnail"),
-                "duration": format_duration(info.get("duration")),
-                "formats": unique_formats[:20],
-                "uploader": info.get("uploader"),
-                "view_count": info.get("view_count"),
-            }
+            return build_video_info(info)
         else:
             error_msg = result.stderr or "Failed to fetch video info"
             return {"error": error_msg}
@@ -175,8 +1356,35 @@ def get_video_info_cli(url):
         return {"error": str(e)}
 
 
+def fetch_video_info_pool(url):
+    try:
+        info = extractor_pool.extract_info(url, noplaylist=True)
+        if not info:
+            return {"error": "Failed to fetch video info"}
+        return build_video_info(info)
+    except (queue.Empty, TimeoutError):
+        return {"error": "Request timed out. Please try again."}
+    except Exception as e:
+        return {"error": str(e)}
+
+
 def get_playlist_info_cli(url):
-    cmd = [YT_DLP_EXE, "--dump-json", "--no-download", "--yes-playlist", "-q", url]
+    cache_key = "playlist:" + (get_canonical_playlist_id(url) or get_canonical_url_key(url))
+    cached = metadata_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    if app_settings["extractor_mode"] == "pool":
+        info = fetch_playlist_info_pool(url)
+    else:
+        info = fetch_playlist_info_cli(url)
+    if info.get("type") == "playlist":
+        metadata_cache.set(cache_key, info)
+    return info
+
+
+def fetch_playlist_info_cli(url):
+    cmd = [get_ytdlp_executable(), "--dump-json", "--no-download", "--yes-playlist", "-q", url]
 
     try:
         result = subprocess.run(
@@ -197,15 +1405,7 @@ def get_playlist_info_cli(url):
         for line in lines:
             if line.strip():
                 try:
-                    entry = json.loads(line)
-                    entries.append(
-                        {
-                            "id": entry.get("id"),
-                            "title": entry.get("title"),
-                            "thumbnail": entry.get("thumbnail"),
-                            "duration": format_duration(entry.get("duration")),
-                        }
-                    )
+                    entries.append(build_playlist_entry(json.loads(line)))
                 except:
                     continue
 
@@ -222,19 +1422,69 @@ def get_playlist_info_cli(url):
         return get_video_info_cli(url)
 
 
-def get_video_info(url):
-    url = url.strip()
+def fetch_playlist_info_pool(url):
+    try:
+        info = extractor_pool.extract_info(url, noplaylist=False)
+        entries = [build_playlist_entry(entry) for entry in (info or {}).get("entries") or [] if entry]
+
+        if not entries:
+            return get_video_info_cli(url)
+
+        return {
+            "type": "playlist",
+            "title": f"Playlist ({len(entries)} videos)",
+            "videos": entries,
+        }
+
+    except Exception:
+        return get_video_info_cli(url)
+
+
+def probe_playlist(url):
+    if app_settings["extractor_mode"] == "pool":
+        return probe_playlist_pool(url)
+    return probe_playlist_cli(url)
+
+
+def probe_playlist_cli(url):
+    try:
+        info_cmd = [get_ytdlp_executable(), "--dump-json", "--no-download", "--flat-playlist", "-q", url]
+        result = subprocess.run(info_cmd, capture_output=True, text=True, timeout=30, encoding="utf-8", errors="replace")
+        if result.returncode != 0 or not result.stdout.strip():
+            return None
+
+        entries = []
+        for line in result.stdout.strip().split("\n"):
+            if line.strip():
+                try:
+                    entries.append(json.loads(line))
+                except:
+                    continue
+
+        title = entries[0].get("playlist_title") if entries else None
+        return {"title": title or "playlist", "entries": entries}
+    except:
+        return None
+
+
+def probe_playlist_pool(url):
+    try:
+        info = extractor_pool.extract_info(url, timeout=30, noplaylist=False, extract_flat="in_playlist")
+        if not info:
+            return None
+        entries = [entry for entry in info.get("entries") or [] if entry]
+        return {"title": info.get("title") or "playlist", "entries": entries}
+    except:
+        return None
 
-    if "watch?v=" in url:
-        import urllib.parse
 
-        parsed = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
-        video_id = parsed.get("v", [None])[0]
-        list_id = parsed.get("list", [None])[0]
+def get_video_info(url):
+    url = url.strip()
 
-        if video_id and list_id:
-            clean_url = f"https://www.youtube.com/watch?v={video_id}"
-            return get_video_info_cli(clean_url)
+    video_id = get_canonical_video_id(url)
+    if video_id and video_id.startswith("youtube:"):
+        clean_url = f"https://www.youtube.com/watch?v={video_id.split(':', 1)[1]}"
+        return get_video_info_cli(clean_url)
 
     if "playlist" in url.lower() or "list=" in url.lower():
         return get_playlist_info_cli(url)
@@ -242,39 +1492,174 @@ def get_video_info(url):
     return get_video_info_cli(url)
 
 
-def progress_hook(task_id):
-    def hook(d):
-        if task_id not in download_progress:
+class LineSplitter:
+    def __init__(self, callback):
+        self.callback = callback
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.buffer = ""
+
+    def feed(self, chunk):
+        parts = PROCESS_LINE_BREAK.split(self.buffer + self.decoder.decode(chunk))
+        self.buffer = parts.pop()
+        for part in parts:
+            self._emit(part)
+
+    def close(self):
+        self._emit(self.buffer + self.decoder.decode(b"", final=True))
+        self.buffer = ""
+
+    def _emit(self, line):
+        line = line.strip()
+        if line and self.callback:
+            self.callback(line)
+
+
+class ProcessSupervisor:
+    def __init__(self, cmd, on_stdout_line=None, on_stderr_line=None, should_stop=None):
+        self.cmd = cmd
+        self.on_stdout_line = on_stdout_line
+        self.on_stderr_line = on_stderr_line
+        self.should_stop = should_stop
+        self.returncode = None
+        self.stopped = False
+
+    def run(self):
+        self.returncode = asyncio.run(self._run())
+        return self.returncode
+
+    async def _run(self):
+        process = await asyncio.create_subprocess_exec(
+            *self.cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        readers = asyncio.gather(
+            self._pump(process.stdout, LineSplitter(self.on_stdout_line)),
+            self._pump(process.stderr, LineSplitter(self.on_stderr_line)),
+        )
+
+        if self.should_stop:
+            while not readers.done():
+                try:
+                    await asyncio.wait_for(asyncio.shield(readers), PROCESS_STOP_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    if self.should_stop() and process.returncode is None:
+                        self.stopped = True
+                        process.terminate()
+
+        await readers
+        return await process.wait()
+
+    async def _pump(self, stream, splitter):
+        while True:
+            chunk = await stream.read(PROCESS_READ_CHUNK)
+            if not chunk:
+                break
+            splitter.feed(chunk)
+        splitter.close()
+
+
+class SpeedEstimator:
+    def __init__(self, half_life):
+        self.half_life = half_life
+        self.speed = None
+        self.last_bytes = None
+        self.last_time = None
+
+    def update(self, downloaded_bytes, now):
+        if self.last_time is None or downloaded_bytes < self.last_bytes:
+            self.last_bytes = downloaded_bytes
+            self.last_time = now
+            return self.speed or 0
+
+        elapsed = now - self.last_time
+        if elapsed < PROGRESS_SAMPLE_MIN_INTERVAL:
+            return self.speed or 0
+
+        instant = (downloaded_bytes - self.last_bytes) / elapsed
+        if self.speed is None:
+            self.speed = instant
+        else:
+            weight = 1 - 0.5 ** (elapsed / self.half_life)
+            self.speed += weight * (instant - self.speed)
+        self.last_bytes = downloaded_bytes
+        self.last_time = now
+        return self.speed
+
+    def eta(self, downloaded_bytes, total_bytes):
+        if not self.speed or not total_bytes or total_bytes <= downloaded_bytes:
+            return None
+        return (total_bytes - downloaded_bytes) / self.speed
+
+
+class ProgressAggregator:
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.last_flush = 0
+        self.estimator = SpeedEstimator(PROGRESS_SPEED_HALF_LIFE)
+
+    def submit(self, changes, force=False):
+        with self.lock:
+            self.pending.update(changes)
+            now = time.monotonic()
+            if not force and now - self.last_flush < app_settings["progress_interval"]:
+                return
+            self.last_flush = now
+            pending, self.pending = self.pending, {}
+
+        progress = download_progress.get(self.task_id)
+        if progress is not None and pending:
+            progress.update(pending)
+
+    def flush(self):
+        self.submit({}, force=True)
+
+    def hook(self, d):
+        if self.task_id not in download_progress:
             return
-        
+
         status = d.get('status', '')
-        
+
         if status == 'downloading':
-            total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-            downloaded_bytes = d.get('downloaded_bytes', 0)
-            
-            if total_bytes > 0:
-                percent = (downloaded_bytes / total_bytes) * 100
-                download_progress[task_id]['progress'] = int(percent)
-                download_progress[task_id]['status'] = f'Downloading ({int(percent)}%)'
-            else:
-                downloaded_mb = downloaded_bytes / (1024 * 1024)
-                download_progress[task_id]['status'] = f'Downloading ({downloaded_mb:.1f} MB)'
-                download_progress[task_id]['progress'] = 0
-            
-            speed = d.get('speed', 0)
-            if speed:
-                download_progress[task_id]['speed'] = format_speed(speed)
-        
+            total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+            downloaded_bytes = d.get('downloaded_bytes') or 0
+            speed = self.estimator.update(downloaded_bytes, time.monotonic())
+            self.submit({
+                'status': 'downloading',
+                'progress': int(downloaded_bytes / total_bytes * 100) if total_bytes > 0 else 0,
+                'downloaded_bytes': downloaded_bytes,
+                'total_bytes': total_bytes,
+                'speed_bps': speed,
+                'eta_seconds': self.estimator.eta(downloaded_bytes, total_bytes),
+            })
+
         elif status == 'finished':
-            download_progress[task_id]['status'] = 'Processing...'
-            download_progress[task_id]['progress'] = 100
-        
+            self.submit({'status': 'processing', 'progress': 100, 'speed_bps': 0, 'eta_seconds': 0}, force=True)
+
         elif status == 'error':
-            download_progress[task_id]['status'] = 'Error'
-            download_progress[task_id]['error'] = d.get('error', 'Download error')
-    
-    return hook
+            self.submit({'status': 'error', 'error': d.get('error', 'Download error')}, force=True)
+
+
+def get_progress_aggregator(task_id):
+    with progress_aggregators_lock:
+        aggregator = progress_aggregators.get(task_id)
+        if aggregator is None:
+            aggregator = progress_aggregators[task_id] = ProgressAggregator(task_id)
+        return aggregator
+
+
+def release_progress_aggregator(task_id):
+    # Call before the final status is written so the last coalesced sample cannot land after it
+    with progress_aggregators_lock:
+        aggregator = progress_aggregators.pop(task_id, None)
+    if aggregator is not None:
+        aggregator.flush()
+
+
+def progress_hook(task_id):
+    return get_progress_aggregator(task_id).hook
 
 
 def format_bytes(bytes_val):
@@ -293,41 +1678,661 @@ def format_speed(speed):
     return ""
 
 
+def format_eta(seconds):
+    if seconds is None:
+        return ""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours > 0:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def present_progress(progress):
+    data = dict(progress)
+    if "speed_bps" in data:
+        data["speed"] = format_speed(data["speed_bps"])
+    if "eta_seconds" in data:
+        data["eta"] = format_eta(data["eta_seconds"])
+    if data.get("downloaded_bytes"):
+        data["downloaded"] = format_bytes(int(data["downloaded_bytes"]))
+    if data.get("total_bytes"):
+        data["total"] = format_bytes(int(data["total_bytes"]))
+
+    status = data.get("status", "")
+    if status == "downloading" and "speed_bps" in data:
+        if data.get("total_bytes"):
+            data["status_text"] = f"Downloading ({data.get('progress', 0)}%)"
+        else:
+            data["status_text"] = f"Downloading ({data.get('downloaded_bytes', 0) / (1024 * 1024):.1f} MB)"
+    else:
+        data["status_text"] = status
+    return data
+
+
 def parse_progress(line, task_id):
     if task_id not in download_progress:
         return
 
+    changes = {}
+    force = False
+
     progress_match = re.search(r"(\d+\.?\d*)%", line)
     if progress_match:
         try:
             percent = float(progress_match.group(1))
-            download_progress[task_id]["progress"] = int(percent)
+            changes["progress"] = int(percent)
         except:
             pass
 
-    speed_match = re.search(r"of\s+([\d.]+\w+)\s+at\s+([\d.]+\w+/s)", line)
+    speed_match = re.search(r"of\s+~?\s*([\d.]+\w+)\s+at\s+([\d.]+\w+)/s", line)
     if speed_match:
-        download_progress[task_id]["downloaded"] = speed_match.group(1)
-        download_progress[task_id]["speed"] = speed_match.group(2)
+        total_bytes = yt_dlp.utils.parse_filesize(speed_match.group(1)) or 0
+        changes["total_bytes"] = total_bytes
+        changes["speed_bps"] = yt_dlp.utils.parse_filesize(speed_match.group(2)) or 0
+        if "progress" in changes:
+            changes["downloaded_bytes"] = int(total_bytes * changes["progress"] / 100)
+
+    eta_match = re.search(r"ETA\s+(\d+):(\d{2})(?::(\d{2}))?", line)
+    if eta_match:
+        parts = [int(part) for part in eta_match.groups() if part is not None]
+        seconds = 0
+        for part in parts:
+            seconds = seconds * 60 + part
+        changes["eta_seconds"] = seconds
 
     if "Destination:" in line:
-        download_progress[task_id]["status"] = "processing"
+        changes["status"] = "processing"
+        force = True
 
     if "Merging formats into" in line:
-        download_progress[task_id]["status"] = "merging"
+        changes["status"] = "merging"
+        force = True
 
     if "Postprocessing" in line:
-        download_progress[task_id]["status"] = "postprocessing"
+        changes["status"] = "postprocessing"
+        force = True
 
     playlist_match = re.search(r"\[download\]\s+(\d+)\s+of\s+(\d+)", line)
     if playlist_match:
         current = int(playlist_match.group(1))
         total = int(playlist_match.group(2))
-        download_progress[task_id]["current_video"] = current
-        download_progress[task_id]["total_videos"] = total
+        changes["current_video"] = current
+        changes["total_videos"] = total
+        force = True
+
+    if changes:
+        get_progress_aggregator(task_id).submit(changes, force)
+
+
+def output_name_taken(download_path, name):
+    # A finished file of that name would make yt-dlp skip the download and report it as ours
+    prefix = name.lower()
+    try:
+        names = os.listdir(download_path)
+    except OSError:
+        return False
+    for entry in names:
+        entry = entry.lower()
+        if entry.startswith(prefix + ".") and re.fullmatch(r"\.\w+", entry[len(prefix):]):
+            return True
+    return False
+
+
+def reserve_output_name(download_path, name, video_id=None):
+    with output_names_lock:
+        key = (os.path.abspath(download_path), name.lower())
+        if video_id and (key in reserved_output_names or output_name_taken(download_path, name)):
+            name = f"{name} [{video_id}]"
+            key = (os.path.abspath(download_path), name.lower())
+        reserved_output_names[key] = reserved_output_names.get(key, 0) + 1
+        return name
+
+
+def release_output_name(download_path, name):
+    if name is None:
+        return
+    with output_names_lock:
+        key = (os.path.abspath(download_path), name.lower())
+        count = reserved_output_names.get(key, 0) - 1
+        if count > 0:
+            reserved_output_names[key] = count
+        else:
+            reserved_output_names.pop(key, None)
+
+
+def read_fragment_index(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        return int(state["downloader"]["current_fragment"]["index"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def prepare_partials(ydl, info):
+    base = os.path.splitext(ydl.prepare_filename(info))[0]
+    requested = info.get("requested_formats")
+    if requested:
+        targets = {f"{base}.f{f['format_id']}.{f['ext']}": f for f in requested}
+    else:
+        targets = {f"{base}.{info.get('ext')}": info}
+
+    directory, prefix = os.path.split(base)
+    groups = {}
+    try:
+        names = os.listdir(directory or ".")
+    except OSError:
+        names = []
+    for name in names:
+        if not name.startswith(prefix + ".") or not PARTIAL_SUFFIX.search(name):
+            continue
+        stem = PARTIAL_SUFFIX.sub("", name)
+        if not PARTIAL_STEM.fullmatch(stem[len(prefix):]):
+            continue
+        groups.setdefault(os.path.join(directory, stem), []).append(os.path.join(directory, name))
+
+    result = {"resumed_bytes": 0, "resumed_fragment": None, "discarded_partials": 0}
+    for stem, paths in groups.items():
+        fmt = targets.get(stem)
+        valid = fmt is not None
+
+        state_file = stem + ".ytdl"
+        fragment = None
+        if valid and state_file in paths:
+            fragment = read_fragment_index(state_file)
+            valid = fragment is not None
+
+        part_file = stem + ".part"
+        size = os.path.getsize(part_file) if part_file in paths else 0
+        expected = fmt and (fmt.get("filesize") or fmt.get("filesize_approx"))
+        if valid and expected and size > expected:
+            valid = False
+
+        if not valid:
+            remove_files(paths)
+            result["discarded_partials"] += len(paths)
+            continue
+
+        result["resumed_bytes"] += size
+        if fragment is not None:
+            result["resumed_fragment"] = max(fragment, result["resumed_fragment"] or 0)
+
+    return result
+
+
+def collect_partials(roots, max_age, dry_run=False):
+    cutoff = time.time() - max_age
+    with output_names_lock:
+        active = {(directory, name) for directory, name in reserved_output_names}
+
+    found = []
+    for root in roots:
+        try:
+            directories = [root] + [entry.path for entry in os.scandir(root) if entry.is_dir()]
+        except OSError:
+            continue
+        for directory in directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if not PARTIAL_SUFFIX.search(entry.name) or not entry.is_file():
+                    continue
+                name = entry.name.lower()
+                if any(
+                    name.startswith(reserved + ".")
+                    for reserved_dir, reserved in active
+                    if reserved_dir == os.path.abspath(directory)
+                ):
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime < cutoff:
+                    found.append({"path": entry.path, "size": stat.st_size, "modified": stat.st_mtime})
+
+    if not dry_run:
+        remove_files(item["path"] for item in found)
+    return found
+
+
+def get_partial_roots():
+    roots = {os.path.abspath(app.config["DOWNLOAD_FOLDER"])}
+    for item in list(download_queue) + list(direct_jobs.values()):
+        if item.get("download_path"):
+            roots.add(os.path.abspath(item["download_path"]))
+    return sorted(roots)
+
+
+def run_partial_gc():
+    while True:
+        max_age = app_settings["partial_max_age_hours"] * 3600
+        if max_age > 0:
+            collect_partials(get_partial_roots(), max_age)
+        time.sleep(PARTIAL_GC_INTERVAL)
+
+
+def get_output_file(info, post_hook_files):
+    if post_hook_files:
+        return post_hook_files[-1]
+    for download in (info or {}).get("requested_downloads") or []:
+        if download.get("filepath"):
+            return download["filepath"]
+    return (info or {}).get("filepath")
+
+
+class ConnectionBudget:
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_use = 0
+        self.changed = threading.Condition()
+
+    def acquire(self, requested):
+        with self.changed:
+            while self.in_use >= self.limit:
+                self.changed.wait()
+            granted = max(1, min(requested, self.limit - self.in_use))
+            self.in_use += granted
+            return granted
+
+    def release(self, granted):
+        with self.changed:
+            self.in_use -= granted
+            self.changed.notify_all()
+
+    def resize(self, limit):
+        with self.changed:
+            self.limit = limit
+            self.changed.notify_all()
+
+    def get_stats(self):
+        with self.changed:
+            return {"limit": self.limit, "in_use": self.in_use}
+
+
+connection_budget = ConnectionBudget(app_settings["max_connections"])
+
+
+def parse_rate_limit(value):
+    if value in (None, ""):
+        return None
+    return max(0, int(value))
+
+
+def parse_weight(value):
+    if value in (None, ""):
+        return None
+    return max(1, int(value))
+
+
+class BandwidthManager:
+    def __init__(self, limit):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.tasks = {}
+        self.last_rebalance = 0
+        self.on_rate_change = None
+
+    def register(self, task_id, limit=None, weight=None, external=False):
+        with self.lock:
+            state = self.tasks.get(task_id)
+            if state is None:
+                state = self.tasks[task_id] = {
+                    "limit": parse_rate_limit(limit) or 0,
+                    "weight": parse_weight(weight) or 1,
+                    "external": external,
+                    "rate": 0,
+                    "tokens": 0.0,
+                    "refilled_at": time.monotonic(),
+                    "last_active": 0,
+                    "bytes": 0,
+                    "usage": 0,
+                    "users": 0,
+                    "estimator": SpeedEstimator(PROGRESS_SPEED_HALF_LIFE),
+                }
+            state["users"] += 1
+            self._rebalance(time.monotonic())
+
+    def unregister(self, task_id):
+        with self.lock:
+            state = self.tasks.get(task_id)
+            if state is None:
+                return
+            state["users"] -= 1
+            if state["users"] <= 0:
+                del self.tasks[task_id]
+                self._rebalance(time.monotonic())
+
+    def set_limit(self, limit):
+        with self.lock:
+            self.limit = limit
+            self._rebalance(time.monotonic())
+
+    def set_task_limit(self, task_id, limit):
+        with self.lock:
+            state = self.tasks.get(task_id)
+            if state is None:
+                return False
+            state["limit"] = parse_rate_limit(limit) or 0
+            self._rebalance(time.monotonic())
+            return True
+
+    def get_rate(self, task_id):
+        with self.lock:
+            state = self.tasks.get(task_id)
+            return state["rate"] if state else 0
+
+    def consume(self, task_id, amount):
+        with self.lock:
+            state = self.tasks.get(task_id)
+            if state is None or amount <= 0:
+                return
+            now = time.monotonic()
+            state["usage"] = state["estimator"].update(state["bytes"], now)
+            state["bytes"] += amount
+            was_idle = now - state["last_active"] > BANDWIDTH_IDLE_TIMEOUT
+            state["last_active"] = now
+            if was_idle:
+                state["tokens"] = 0.0
+                state["refilled_at"] = now
+            if was_idle or now - self.last_rebalance > BANDWIDTH_REBALANCE_INTERVAL:
+                self._rebalance(now)
+            self._refill(state, now)
+            state["tokens"] -= amount
+
+        while True:
+            with self.lock:
+                if self.tasks.get(task_id) is not state or not state["rate"]:
+                    return
+                now = time.monotonic()
+                self._refill(state, now)
+                if state["tokens"] >= 0:
+                    return
+                state["last_active"] = now
+                delay = -state["tokens"] / state["rate"]
+            time.sleep(min(delay, BANDWIDTH_MAX_SLEEP))
+
+    def hook(self, task_id):
+        seen = {}
+
+        def hook(d):
+            if d.get("status") != "downloading":
+                return
+            key = d.get("tmpfilename") or d.get("filename")
+            downloaded = d.get("downloaded_bytes") or 0
+            # downloaded_bytes includes whatever was already in the .part file, so the
+            # first sample is only a baseline and is never charged
+            previous = seen.get(key, downloaded)
+            seen[key] = downloaded
+            self.consume(task_id, downloaded - previous)
+
+        return hook
+
+    def observe(self, task_id, downloaded):
+        # Bytes counted in another process: track usage without throttling here
+        with self.lock:
+            state = self.tasks.get(task_id)
+            if state is None:
+                return
+            base = state.setdefault("observed_from", downloaded)
+            if downloaded - base <= state["bytes"]:
+                return
+            now = time.monotonic()
+            state["bytes"] = downloaded - base
+            state["usage"] = state["estimator"].update(state["bytes"], now)
+            state["last_active"] = now
+
+    def get_usage(self):
+        now = time.monotonic()
+        with self.lock:
+            tasks = {}
+            for task_id, state in self.tasks.items():
+                active = now - state["last_active"] <= BANDWIDTH_IDLE_TIMEOUT
+                tasks[task_id] = {
+                    "rate_limit_bps": int(state["rate"]),
+                    "usage_bps": int(state["usage"]) if active else 0,
+                    "bytes": state["bytes"],
+                    "weight": state["weight"],
+                }
+            return {
+                "limit_bps": self.limit,
+                "usage_bps": sum(task["usage_bps"] for task in tasks.values()),
+                "tasks": tasks,
+            }
 
+    def _refill(self, state, now):
+        rate = state["rate"]
+        if rate:
+            state["tokens"] = min(
+                rate * BANDWIDTH_BURST_SECONDS,
+                state["tokens"] + (now - state["refilled_at"]) * rate,
+            )
+        else:
+            state["tokens"] = 0.0
+        state["refilled_at"] = now
+
+    def _rebalance(self, now):
+        self.last_rebalance = now
+        previous = {task_id: state["rate"] for task_id, state in self.tasks.items()}
+        self._share(now)
+        # Rates show up in the queue listing, so a change must move its version
+        for task_id, state in self.tasks.items():
+            if int(state["rate"]) != int(previous[task_id]):
+                queue_feed.touch(task_id)
+                if self.on_rate_change is not None:
+                    self.on_rate_change(task_id, state["rate"])
+
+    def _share(self, now):
+        active = []
+        for state in self.tasks.values():
+            # A yt-dlp subprocess enforces its own --limit-rate and never reports
+            # bytes here, so it holds its share for as long as it is registered
+            if state["external"] or now - state["last_active"] <= BANDWIDTH_IDLE_TIMEOUT:
+                active.append(state)
+            else:
+                state["rate"] = state["limit"] or self.limit
+
+        if not self.limit:
+            for state in active:
+                state["rate"] = state["limit"]
+            return
+
+        remaining = self.limit
+        weight_left = sum(state["weight"] for state in active)
+        for state in sorted(active, key=lambda item: item["limit"] / item["weight"] if item["limit"] else float("inf")):
+            share = remaining * state["weight"] / weight_left
+            state["rate"] = min(share, state["limit"]) if state["limit"] else share
+            remaining -= state["rate"]
+            weight_left -= state["weight"]
+
+
+bandwidth = BandwidthManager(app_settings["bandwidth_limit"])
 
-def download_video(url, format_id, task_id, audio_only=False, download_path=None):
+
+def get_task_connections(connections=None):
+    try:
+        requested = int(connections or app_settings["fragment_concurrency"])
+    except (TypeError, ValueError):
+        requested = app_settings["fragment_concurrency"]
+    return max(1, min(MAX_FRAGMENT_CONCURRENCY, requested))
+
+
+def build_finishing_options(format_id, audio_only, audio_format=None, container=None):
+    if audio_format not in AUDIO_FORMATS:
+        audio_format = app_settings["audio_format"]
+    if container not in VIDEO_CONTAINERS:
+        container = app_settings["video_container"]
+
+    if audio_only:
+        return {
+            "format": AUDIO_FORMATS[audio_format][0],
+            "postprocessors": [{
+                "key": "FFmpegExtractAudio",
+                "preferredcodec": audio_format,
+                "preferredquality": "0",
+            }],
+        }, audio_format
+
+    if container == "mp4":
+        if format_id == "best":
+            fmt = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
+        else:
+            fmt = f"{format_id}+bestaudio[ext=m4a]/bestvideo[ext=webm]+bestaudio/best[ext=mp4]/best"
+    elif container == "webm":
+        if format_id == "best":
+            fmt = "bestvideo[ext=webm]+bestaudio[ext=webm]/best[ext=webm]/bestvideo+bestaudio/best"
+        else:
+            fmt = f"{format_id}+bestaudio[ext=webm]/{format_id}+bestaudio/best"
+    else:
+        fmt = "bestvideo+bestaudio/best" if format_id == "best" else f"{format_id}+bestaudio/best"
+
+    options = {"format": fmt}
+    if VIDEO_CONTAINERS[container]:
+        options["merge_output_format"] = VIDEO_CONTAINERS[container]
+    return options, audio_format
+
+
+def build_finishing_args(options):
+    args = ["--format", options["format"]]
+    if options.get("merge_output_format"):
+        args += ["--merge-output-format", options["merge_output_format"]]
+    for pp in options.get("postprocessors", []):
+        args += ["--extract-audio", "--audio-format", pp["preferredcodec"], "--audio-quality", pp["preferredquality"]]
+    return args
+
+
+def get_finishing_action(step, acodec, audio_format):
+    if step == "ExtractAudio":
+        codecs = AUDIO_FORMATS.get(audio_format, ("", ()))[1]
+        if audio_format == "best" or any((acodec or "").startswith(codec) for codec in codecs):
+            return "copy"
+        return "transcode"
+    if step in ("Merger", "VideoRemuxer"):
+        return "remux"
+    if step == "VideoConvertor":
+        return "transcode"
+    return "fixup"
+
+
+def finishing_hook(audio_format, on_step):
+    started = {}
+
+    def hook(d):
+        step = d.get("postprocessor")
+        if step == "MoveFiles":
+            return
+        if d.get("status") == "started":
+            info = d.get("info_dict") or {}
+            started[step] = (time.monotonic(), info.get("acodec") or info.get("ext"))
+        elif d.get("status") == "finished" and step in started:
+            began, acodec = started.pop(step)
+            on_step({
+                "step": step,
+                "action": get_finishing_action(step, acodec, audio_format),
+                "seconds": round(time.monotonic() - began, 2),
+            })
+
+    return hook
+
+
+class DeferredYoutubeDL(yt_dlp.YoutubeDL):
+    def __init__(self, params, defer=True):
+        super().__init__(params)
+        self.defer = defer
+        self.deferred = []
+
+    def post_process(self, filename, info, files_to_move=None):
+        if not self.defer or not (info.get("__postprocessors") or self._pps["post_process"]):
+            return super().post_process(filename, info, files_to_move)
+        info["filepath"] = filename
+        self.deferred.append((filename, dict(info), files_to_move))
+        return info
+
+    def run_deferred(self):
+        info = None
+        for filename, info, files_to_move in self.deferred:
+            info = super().post_process(filename, info, files_to_move)
+        self.deferred = []
+        return info
+
+
+class PostProcessPool:
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="postprocess")
+        self.stats = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+
+    def submit(self, ydl, on_start, on_done):
+        with self.lock:
+            self.stats["queued"] += 1
+        return self.executor.submit(self._run, ydl, on_start, on_done)
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, size=self.size)
+
+    def _run(self, ydl, on_start, on_done):
+        with self.lock:
+            self.stats["queued"] -= 1
+            self.stats["running"] += 1
+        on_start()
+        started = time.monotonic()
+        info = error = None
+        try:
+            info = ydl.run_deferred()
+        except Exception as e:
+            error = str(e)
+        finally:
+            ydl.close()
+            with self.lock:
+                self.stats["running"] -= 1
+                self.stats["failed" if error else "completed"] += 1
+        on_done(info, error, time.monotonic() - started)
+
+
+postprocess_pool = PostProcessPool(POSTPROCESS_WORKERS)
+
+
+def finish_download(task_id, info, output_file, video_key, archive_mode):
+    if output_file and os.path.exists(output_file):
+        download_archive.add(video_key, archive_mode, output_file, info.get('title'))
+        download_progress[task_id].update({
+            "status": "completed",
+            "filename": os.path.basename(output_file),
+            "filepath": output_file,
+            "progress": 100,
+        })
+        download_queue.set_status(task_id, "completed")
+    else:
+        download_progress[task_id].update({"status": "error", "error": "Output file not found"})
+        download_queue.set_status(task_id, "error")
+
+
+def get_progressive_source(ydl, info, audio_only):
+    if audio_only or info.get("requested_formats") or info.get("protocol") not in PROGRESSIVE_PROTOCOLS:
+        return None
+    return {"stream_path": ydl.prepare_filename(info), "stream_size": info.get("filesize")}
+
+
+def progressive_size_hook(task_id):
+    def hook(d):
+        progress = download_progress.get(task_id)
+        if d.get("total_bytes") and progress is not None and not progress.get("stream_size"):
+            progress["stream_size"] = d["total_bytes"]
+
+    return hook
+
+
+def download_video(url, format_id, task_id, audio_only=False, download_path=None, connections=None, rate_limit=None, weight=None, audio_format=None, container=None):
     if download_path is None:
         download_path = app.config["DOWNLOAD_FOLDER"]
     
@@ -351,105 +2356,122 @@ def download_video(url, format_id, task_id, audio_only=False, download_path=None
         }
 
         ffmpeg_loc = get_ffmpeg_location()
-        if ffmpeg_loc:
-            os.environ["PATH"] = ffmpeg_loc + os.pathsep + os.environ.get("PATH", "")
 
-        video_title = task_id
-        try:
-            with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
-                info = ydl.extract_info(url, download=False)
-                if info:
-                    video_title = sanitize_filename(info.get('title', task_id))
-        except:
-            pass
-
-        output_path = os.path.join(download_path, video_title)
+        output_files = []
+        output_name = None
 
         ydl_opts = {
-            'progress_hooks': [progress_hook(task_id)],
-            'outtmpl': output_path + '.%(ext)s',
+            'progress_hooks': [bandwidth.hook(task_id), progress_hook(task_id)],
+            'post_hooks': [output_files.append],
+            'outtmpl': os.path.join(download_path, '%(zen_filename)s.%(ext)s'),
+            'noprogress': True,
             'noplaylist': True,
+            'continuedl': True,
+            'buffersize': BANDWIDTH_BLOCK_SIZE,
+            'noresizebuffer': True,
             'nocheckcertificate': True,
             'ffmpeg_location': ffmpeg_loc if ffmpeg_loc else None,
         }
 
-        if audio_only:
-            ydl_opts.update({
-                'format': 'bestaudio/best',
-                'extractaudio': True,
-                'audioformat': 'mp3',
-                'audioquality': '0',
-            })
-        else:
-            if format_id == "best":
-                fmt = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
-            else:
-                fmt = f"{format_id}+bestaudio[ext=m4a]/bestvideo[ext=webm]+bestaudio/best[ext=mp4]/best"
-            
-            ydl_opts.update({
-                'format': fmt,
-                'merge_output_format': 'mp4',
-            })
+        finishing, audio_format = build_finishing_options(format_id, audio_only, audio_format, container)
+        ydl_opts.update(finishing)
 
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
-
-            output_file = None
-            for ext in ['.mp3', '.mp4', '.mkv', '.webm', '.m4a']:
-                potential_file = output_path + ext
-                if os.path.exists(potential_file):
-                    output_file = potential_file
-                    break
+        def on_finishing_step(step):
+            progress = download_progress[task_id]
+            progress["finishing_steps"] = progress.get("finishing_steps", []) + [step]
 
-            if output_file and os.path.exists(output_file):
-                filename = os.path.basename(output_file)
-                download_progress[task_id]["status"] = "completed"
-                download_progress[task_id]["filename"] = filename
-                download_progress[task_id]["progress"] = 100
-                
-                with queue_lock:
-                    for item in download_queue:
-                        if item.get("task_id") == task_id:
-                            item["status"] = "completed"
-                            break
-                
-                threading.Thread(target=process_queue, daemon=True).start()
-            else:
-                download_progress[task_id]["status"] = "error"
-                download_progress[task_id]["error"] = "Output file not found"
-                
-                with queue_lock:
-                    for item in download_queue:
-                        if item.get("task_id") == task_id:
-                            item["status"] = "error"
-                            break
-                
-                threading.Thread(target=process_queue, daemon=True).start()
+        ydl_opts['postprocessor_hooks'] = [finishing_hook(audio_format, on_finishing_step)]
+
+        granted = connection_budget.acquire(get_task_connections(connections))
+        ydl_opts['concurrent_fragment_downloads'] = granted
+        download_progress[task_id]["connections"] = granted
+        bandwidth.register(task_id, rate_limit, weight)
+
+        ydl = None
+        handed_off = False
+
+        try:
+            ydl = DeferredYoutubeDL(ydl_opts, defer=worker_events is None)
+            info = ydl.extract_info(url, download=False)
+            video_key = get_archive_key(info)
+            archive_mode = get_archive_mode(format_id, audio_only, audio_format, container)
+            archived_file = download_archive.resolve(video_key, archive_mode, download_path)
+            if archived_file:
+                download_progress[task_id].update({
+                    "status": "completed",
+                    "filename": os.path.basename(archived_file),
+                    "filepath": archived_file,
+                    "progress": 100,
+                    "duplicate": True,
+                })
+                download_queue.set_status(task_id, "completed")
+                return
+            output_name = reserve_output_name(
+                download_path, sanitize_filename(info.get('title') or task_id) or task_id, info.get('id')
+            )
+            info['zen_filename'] = output_name
+            resume = prepare_partials(ydl, info)
+            if resume["resumed_bytes"] or resume["resumed_fragment"]:
+                download_progress[task_id].update(resume)
+            stream = get_progressive_source(ydl, info, audio_only)
+            if stream:
+                download_progress[task_id].update(stream)
+                if not stream["stream_size"]:
+                    ydl.add_progress_hook(progressive_size_hook(task_id))
+            info = ydl.process_ie_result(info, download=True)
+            release_progress_aggregator(task_id)
+
+            if ydl.deferred:
+                reserved_name = output_name
+
+                def on_start():
+                    download_progress[task_id]["postprocess"] = "running"
+
+                def on_done(processed, error, elapsed):
+                    release_output_name(download_path, reserved_name)
+                    download_progress[task_id]["postprocess_seconds"] = round(elapsed, 2)
+                    if error:
+                        download_progress[task_id].update({"status": "error", "error": error})
+                        download_queue.set_status(task_id, "error")
+                        return
+                    finish_download(task_id, processed, get_output_file(processed, []), video_key, archive_mode)
+
+                download_progress[task_id].update({
+                    "status": "processing",
+                    "progress": 100,
+                    "speed_bps": 0,
+                    "eta_seconds": None,
+                    "postprocess": "queued",
+                })
+                download_queue.set_status(task_id, "processing")
+                postprocess_pool.submit(ydl, on_start, on_done)
+                handed_off = True
+                output_name = None
+                return
+
+            finish_download(task_id, info, get_output_file(info, output_files), video_key, archive_mode)
 
         except yt_dlp.utils.DownloadError as e:
+            release_progress_aggregator(task_id)
             download_progress[task_id]["status"] = "error"
             download_progress[task_id]["error"] = str(e)
             
-            with queue_lock:
-                for item in download_queue:
-                    if item.get("task_id") == task_id:
-                        item["status"] = "error"
-                        break
-            
-            threading.Thread(target=process_queue, daemon=True).start()
+            download_queue.set_status(task_id, "error")
 
         except Exception as e:
+            release_progress_aggregator(task_id)
             download_progress[task_id]["status"] = "error"
             download_progress[task_id]["error"] = str(e)
             
-            with queue_lock:
-                for item in download_queue:
-                    if item.get("task_id") == task_id:
-                        item["status"] = "error"
-                        break
-            
-            threading.Thread(target=process_queue, daemon=True).start()
+            download_queue.set_status(task_id, "error")
+
+        finally:
+            connection_budget.release(granted)
+            bandwidth.unregister(task_id)
+            release_output_name(download_path, output_name)
+            release_progress_aggregator(task_id)
+            if ydl is not None and not handed_off:
+                ydl.close()
 
     except Exception as e:
         download_progress[task_id] = {
@@ -459,16 +2481,246 @@ def download_video(url, format_id, task_id, audio_only=False, download_path=None
             "error": str(e),
         }
         
-        with queue_lock:
-            for item in download_queue:
-                if item.get("task_id") == task_id:
-                    item["status"] = "error"
-                    break
-        
-        threading.Thread(target=process_queue, daemon=True).start()
+        download_queue.set_status(task_id, "error")
+
+
+class PlaylistProgress:
+    def __init__(self, task_id, entries, audio_format=None):
+        self.task_id = task_id
+        self.audio_format = audio_format
+        self.lock = threading.Lock()
+        self.states = [
+            {
+                "title": entry.get("title") or entry.get("id") or f"Video {index + 1}",
+                "status": "pending",
+                "progress": 0,
+                "downloaded_bytes": 0,
+                "total_bytes": 0,
+                "speed": 0,
+                "attempt": 0,
+                "error": None,
+                "finishing_steps": [],
+            }
+            for index, entry in enumerate(entries)
+        ]
+        self.estimators = [SpeedEstimator(PROGRESS_SPEED_HALF_LIFE) for _ in entries]
+        self.postprocessing = []
+        self.last_publish = 0
+
+    def update(self, index, **changes):
+        with self.lock:
+            force = "status" in changes
+            if "downloaded_bytes" in changes and not force:
+                changes["speed"] = self.estimators[index].update(changes["downloaded_bytes"], time.monotonic())
+            elif force:
+                self.estimators[index] = SpeedEstimator(PROGRESS_SPEED_HALF_LIFE)
+            self.states[index].update(changes)
+
+            now = time.monotonic()
+            if not force and now - self.last_publish < app_settings["progress_interval"]:
+                return
+            self.last_publish = now
+            self._publish()
+
+    def add_finishing_step(self, index, step):
+        with self.lock:
+            steps = self.states[index]["finishing_steps"] + [step]
+        self.update(index, finishing_steps=steps)
+
+    def counts(self):
+        with self.lock:
+            completed = sum(1 for state in self.states if state["status"] == "completed")
+            failed = sum(1 for state in self.states if state["status"] == "error")
+            return completed, failed
+
+    def _publish(self):
+        progress = download_progress.get(self.task_id)
+        if progress is None:
+            return
+
+        total = len(self.states)
+        finished = 0
+        fraction = 0.0
+        downloaded_bytes = 0
+        total_bytes = 0
+        speed = 0
+        active = 0
+        for state in self.states:
+            downloaded_bytes += state["downloaded_bytes"]
+            total_bytes += state["total_bytes"]
+            if state["status"] in ("completed", "error"):
+                finished += 1
+                fraction += 1
+            elif state["status"] == "processing":
+                fraction += 1
+            elif state["status"] == "downloading":
+                active += 1
+                speed += state["speed"] or 0
+                fraction += state["progress"] / 100
+
+        progress.update({
+            "current_video": finished,
+            "total_videos": total,
+            "active_videos": active,
+            "progress": int(fraction / total * 100) if total else 0,
+            "downloaded_bytes": downloaded_bytes,
+            "total_bytes": total_bytes,
+            "speed_bps": speed,
+            "eta_seconds": (total_bytes - downloaded_bytes) / speed if speed and total_bytes > downloaded_bytes else None,
+            "entries": [
+                {
+                    "title": state["title"],
+                    "status": state["status"],
+                    "progress": state["progress"],
+                    "error": state["error"],
+                    "finishing_steps": state["finishing_steps"],
+                }
+                for state in self.states
+            ],
+        })
+
+
+def playlist_entry_hook(playlist, index):
+    def hook(d):
+        if d.get("status") != "downloading":
+            return
+        total_bytes = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
+        downloaded_bytes = d.get("downloaded_bytes") or 0
+        playlist.update(
+            index,
+            downloaded_bytes=downloaded_bytes,
+            total_bytes=total_bytes,
+            progress=int(downloaded_bytes / total_bytes * 100) if total_bytes else 0,
+        )
+
+    return hook
+
+
+def get_playlist_entry_url(entry):
+    entry_url = entry.get("webpage_url") or entry.get("url")
+    if entry_url and "://" in entry_url:
+        return entry_url
+    if entry.get("ie_key") == "Youtube" or entry.get("extractor_key") == "Youtube" or not entry_url:
+        return f"https://www.youtube.com/watch?v={entry.get('id')}"
+    return entry_url
+
+
+def download_playlist_entry(entry, index, playlist, ydl_opts, archive_mode, connections):
+    entry_url = get_playlist_entry_url(entry)
+    download_path = os.path.dirname(ydl_opts["outtmpl"])
+    error = None
+
+    archived_file = download_archive.resolve(get_archive_key(entry), archive_mode, download_path)
+    if archived_file:
+        playlist.update(index, status="completed", progress=100, speed=0, error=None, duplicate=True)
+        return True
+
+    for attempt in range(PLAYLIST_ENTRY_RETRIES + 1):
+        if attempt:
+            time.sleep(PLAYLIST_RETRY_BACKOFF * attempt)
+        playlist.update(
+            index, status="downloading", attempt=attempt + 1, progress=0, downloaded_bytes=0, speed=0
+        )
+        opts = dict(ydl_opts)
+        opts["progress_hooks"] = [bandwidth.hook(playlist.task_id), playlist_entry_hook(playlist, index)]
+        opts["postprocessor_hooks"] = [
+            finishing_hook(playlist.audio_format, lambda step: playlist.add_finishing_step(index, step))
+        ]
+        output_files = []
+        opts["post_hooks"] = [output_files.append]
+        granted = connection_budget.acquire(get_task_connections(connections))
+        opts["concurrent_fragment_downloads"] = granted
+        ydl = DeferredYoutubeDL(opts, defer=worker_events is None)
+        try:
+            info = ydl.extract_info(entry_url, download=False)
+            video_key = get_archive_key(info)
+            archived_file = download_archive.resolve(video_key, archive_mode, download_path)
+            if archived_file:
+                playlist.update(index, status="completed", progress=100, speed=0, error=None, duplicate=True)
+                return True
+            resume = prepare_partials(ydl, info)
+            if resume["resumed_bytes"]:
+                playlist.update(index, resumed_bytes=resume["resumed_bytes"])
+            info = ydl.process_ie_result(info, download=True)
+
+            if ydl.deferred:
+                def on_start():
+                    playlist.update(index, status="processing", speed=0)
+
+                def on_done(processed, error, elapsed):
+                    if error:
+                        playlist.update(index, status="error", error=error, postprocess_seconds=elapsed)
+                        return
+                    output_file = get_output_file(processed, [])
+                    if output_file and os.path.exists(output_file):
+                        download_archive.add(video_key, archive_mode, output_file, processed.get("title"))
+                    playlist.update(index, status="completed", progress=100, error=None, postprocess_seconds=elapsed)
+
+                playlist.update(index, status="processing", progress=100, speed=0)
+                playlist.postprocessing.append(postprocess_pool.submit(ydl, on_start, on_done))
+                ydl = None
+                return True
+
+            output_file = get_output_file(info, output_files)
+            if output_file and os.path.exists(output_file):
+                download_archive.add(video_key, archive_mode, output_file, info.get("title"))
+            playlist.update(index, status="completed", progress=100, speed=0, error=None)
+            return True
+        except Exception as e:
+            error = str(e)
+        finally:
+            connection_budget.release(granted)
+            if ydl is not None:
+                ydl.close()
+
+    playlist.update(index, status="error", speed=0, error=error)
+    return False
+
+
+def download_playlist_entries(entries, format_id, task_id, audio_only, output_template, ffmpeg_loc, concurrent, playlist_title, connections=None, rate_limit=None, weight=None, audio_format=None, container=None):
+    ydl_opts = {
+        "outtmpl": output_template,
+        "noplaylist": True,
+        "nocheckcertificate": True,
+        "quiet": True,
+        "no_warnings": True,
+        "noprogress": True,
+        "continuedl": True,
+        "buffersize": BANDWIDTH_BLOCK_SIZE,
+        "noresizebuffer": True,
+        "ffmpeg_location": ffmpeg_loc if ffmpeg_loc else None,
+    }
+
+    finishing, audio_format = build_finishing_options(format_id, audio_only, audio_format, container)
+    ydl_opts.update(finishing)
+
+    playlist = PlaylistProgress(task_id, entries, audio_format)
+    archive_mode = get_archive_mode(format_id, audio_only, audio_format, container)
+    workers = max(1, min(int(concurrent or 1), len(entries)))
+
+    bandwidth.register(task_id, rate_limit, weight)
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="playlist") as executor:
+            for index, entry in enumerate(entries):
+                executor.submit(download_playlist_entry, entry, index, playlist, ydl_opts, archive_mode, connections)
+    finally:
+        bandwidth.unregister(task_id)
+    wait(playlist.postprocessing)
+
+    completed, failed = playlist.counts()
+    download_progress[task_id].update({"speed_bps": 0, "eta_seconds": None, "failed_videos": failed})
+
+    if completed == 0:
+        download_progress[task_id]["status"] = "error"
+        download_progress[task_id]["error"] = f"All {failed} playlist videos failed to download"
+        return
+
+    download_progress[task_id]["status"] = "completed"
+    download_progress[task_id]["progress"] = 100
+    download_progress[task_id]["filename"] = f"Playlist: {playlist_title}"
 
 
-def download_playlist(url, format_id, task_id, audio_only=False, download_path=None, concurrent=3):
+def download_playlist(url, format_id, task_id, audio_only=False, download_path=None, concurrent=3, connections=None, rate_limit=None, weight=None, audio_format=None, container=None):
     if download_path is None:
         download_path = app.config["DOWNLOAD_FOLDER"]
     
@@ -494,86 +2746,52 @@ def download_playlist(url, format_id, task_id, audio_only=False, download_path=N
         }
 
         ffmpeg_loc = get_ffmpeg_location()
-        if ffmpeg_loc:
-            os.environ["PATH"] = ffmpeg_loc + os.pathsep + os.environ.get("PATH", "")
 
         playlist_title = "playlist"
-        try:
-            info_cmd = [YT_DLP_EXE, "--dump-json", "--no-download", "--flat-playlist", "-q", url]
-            result = subprocess.run(info_cmd, capture_output=True, text=True, timeout=30, encoding="utf-8", errors="replace")
-            if result.returncode == 0 and result.stdout.strip():
-                lines = result.stdout.strip().split("\n")
-                count = sum(1 for line in lines if line.strip())
-                download_progress[task_id]["total_videos"] = count
-                if count > 0:
-                    try:
-                        first = json.loads(lines[0])
-                        playlist_title = sanitize_filename(first.get("playlist_title", "playlist"))
-                    except:
-                        pass
-        except:
-            pass
-
-        output_template = os.path.join(download_path, playlist_title, "%(title)s.%(ext)s")
+        probe = probe_playlist(url)
+        if probe:
+            download_progress[task_id]["total_videos"] = len(probe["entries"])
+            if probe["title"]:
+                playlist_title = sanitize_filename(probe["title"])
+
+        output_template = os.path.join(download_path, playlist_title, "%(title)s [%(id)s].%(ext)s")
+        download_progress[task_id]["folder"] = os.path.dirname(output_template)
+
+        if probe and probe["entries"]:
+            download_playlist_entries(
+                probe["entries"], format_id, task_id, audio_only, output_template, ffmpeg_loc, concurrent, playlist_title,
+                connections, rate_limit, weight, audio_format, container,
+            )
+            return
         
         ffmpeg_arg = ["--ffmpeg-location", ffmpeg_loc] if ffmpeg_loc else []
+        granted = connection_budget.acquire(get_task_connections(connections))
+        fragment_arg = ["--concurrent-fragments", str(granted)]
+        bandwidth.register(task_id, rate_limit, weight, external=True)
+        task_rate = bandwidth.get_rate(task_id)
+        if task_rate:
+            fragment_arg += ["--limit-rate", str(int(task_rate))]
+
+        finishing, _ = build_finishing_options(format_id, audio_only, audio_format, container)
+        cmd = [
+            get_ytdlp_executable(),
+            "--output", output_template,
+            "--yes-playlist",
+            "--continue",
+            "--no-warnings",
+            "--no-check-certificate",
+        ] + build_finishing_args(finishing) + ffmpeg_arg + fragment_arg + [url]
 
-        if audio_only:
-            cmd = [
-                YT_DLP_EXE,
-                "--format", "bestaudio/best",
-                "--output", output_template,
-                "--extract-audio",
-                "--audio-format", "mp3",
-                "--audio-quality", "0",
-                "--yes-playlist",
-                "--no-warnings",
-                "--no-check-certificate",
-            ] + ffmpeg_arg + [url]
-        else:
-            if format_id == "best":
-                fmt = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
-            else:
-                fmt = f"{format_id}+bestaudio[ext=m4a]/bestvideo[ext=webm]+bestaudio/best[ext=mp4]/best"
-
-            cmd = [
-                YT_DLP_EXE,
-                "--format", fmt,
-                "--output", output_template,
-                "--merge-output-format", "mp4",
-                "--yes-playlist",
-                "--no-warnings",
-                "--no-check-certificate",
-            ] + ffmpeg_arg + [url]
-
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-            bufsize=1,
-        )
-
-        stderr_stream = process.stderr
-        if stderr_stream:
-            stderr_lines = []
-            while True:
-                char = stderr_stream.read(1)
-                if not char:
-                    if process.poll() is not None:
-                        break
-                    continue
-                if char == "\r" or char == "\n":
-                    line = "".join(stderr_lines).strip()
-                    if line:
-                        parse_progress(line, task_id)
-                    stderr_lines = []
-                else:
-                    stderr_lines.append(char)
+        def on_line(line):
+            parse_progress(line, task_id)
 
-        process.wait()
+        process = ProcessSupervisor(cmd, on_stdout_line=on_line, on_stderr_line=on_line)
+        try:
+            process.run()
+        finally:
+            connection_budget.release(granted)
+            bandwidth.unregister(task_id)
+        release_progress_aggregator(task_id)
 
         if process.returncode != 0:
             download_progress[task_id]["status"] = "error"
@@ -585,48 +2803,246 @@ def download_playlist(url, format_id, task_id, audio_only=False, download_path=N
         download_progress[task_id]["filename"] = f"Playlist: {playlist_title}"
 
     except Exception as e:
+        release_progress_aggregator(task_id)
         download_progress[task_id]["status"] = "error"
         download_progress[task_id]["error"] = str(e)
 
 
-def process_queue():
-    global processing_queue
-    
-    with queue_lock:
-        if processing_queue:
-            return
-        processing_queue = True
-    
-    while True:
-        items_to_process = []
-        
-        with queue_lock:
-            active_count = sum(1 for item in download_queue if item.get("status") == "downloading")
-            available_slots = app_settings["concurrent_downloads"] - active_count
-            
-            pending_items = [item for item in download_queue if item.get("status") == "pending"]
-            
-            if available_slots <= 0:
-                if active_count == 0:
-                    processing_queue = False
-                    break
-            elif not pending_items:
-                if active_count == 0:
-                    processing_queue = False
-                    break
-            
-            if available_slots > 0 and pending_items:
-                items_to_process = pending_items[:available_slots]
-        
-        if not items_to_process:
-            time.sleep(0.5)
-            continue
-            
-        for item in items_to_process:
-            with queue_lock:
-                item["status"] = "downloading"
-                item["started_at"] = str(uuid.uuid4())
-            
+def init_download_worker(events, rates):
+    global worker_events, worker_rates
+    worker_events = events
+    worker_rates = rates
+
+
+def follow_process_rate(task_id, slot, applied, stop):
+    # The parent re-splits the bandwidth cap as tasks come and go and posts each share here
+    while not stop.wait(BANDWIDTH_REBALANCE_INTERVAL):
+        rate = int(worker_rates[slot])
+        if rate != applied and bandwidth.set_task_limit(task_id, rate):
+            applied = rate
+
+
+def run_download_job(job):
+    toolchain.load(job["toolchain"])
+    app_settings.update(job["settings"])
+    app_settings["bandwidth_limit"] = 0
+    bandwidth.set_limit(0)
+    task_id = job["task_id"]
+    stop = threading.Event()
+    if job["rate_slot"] is not None:
+        threading.Thread(
+            target=follow_process_rate, args=(task_id, job["rate_slot"], job["rate_limit"], stop), daemon=True
+        ).start()
+    try:
+        download_video(
+            job["url"],
+            job["format_id"],
+            task_id,
+            job["audio_only"],
+            job["download_path"],
+            job["connections"],
+            job["rate_limit"],
+            audio_format=job["audio_format"],
+            container=job["container"],
+        )
+    finally:
+        stop.set()
+    return dict(dict.get(download_progress, task_id) or {})
+
+
+class DownloadProcessPool:
+    def __init__(self, max_jobs):
+        self.max_jobs = max_jobs
+        self.lock = threading.Lock()
+        self.context = multiprocessing.get_context("spawn")
+        self.events = None
+        self.executor = None
+        self.size = 0
+        self.submitted = 0
+        self.recycled = 0
+        self.rates = None
+        self.slots = {}
+        self.slots_lock = threading.Lock()
+        # Only tasks in flight accept worker events; late ones for finished tasks are dropped.
+        # The check and the write share records_lock so a late event cannot land after the final record
+        self.in_flight = set()
+        self.records_lock = threading.Lock()
+
+    def run(self, item):
+        task_id = item["task_id"]
+        self._start_channels()
+        with self.records_lock:
+            self.in_flight.add(task_id)
+        with self.slots_lock:
+            used = set(self.slots.values())
+            slot = next((index for index in range(PROCESS_RATE_SLOTS) if index not in used), None)
+            if slot is not None:
+                self.slots[task_id] = slot
+        # Registered here as external so the cap is split across the tasks actually running
+        bandwidth.register(task_id, item.get("rate_limit"), item.get("weight"), external=True)
+        rate = int(bandwidth.get_rate(task_id))
+        if slot is not None:
+            self.rates[slot] = rate
+        granted = connection_budget.acquire(get_task_connections(item.get("connections")))
+        job = {
+            "task_id": task_id,
+            "url": item["url"],
+            "format_id": item["format_id"],
+            "audio_only": item.get("audio_only", False),
+            "download_path": item.get("download_path", app.config["DOWNLOAD_FOLDER"]),
+            "connections": granted,
+            "rate_limit": rate,
+            "rate_slot": slot,
+            "audio_format": item.get("audio_format"),
+            "container": item.get("video_container"),
+            "settings": dict(app_settings),
+            "toolchain": toolchain.get(),
+        }
+        try:
+            record = self._submit(job).result()
+        except BrokenProcessPool:
+            with self.lock:
+                self.executor = None
+            record = {"status": "error", "progress": 0, "filename": None, "error": "Download worker exited unexpectedly"}
+        except Exception as e:
+            record = {"status": "error", "progress": 0, "filename": None, "error": str(e)}
+        finally:
+            connection_budget.release(granted)
+            bandwidth.unregister(task_id)
+            with self.slots_lock:
+                self.slots.pop(task_id, None)
+        with self.records_lock:
+            self.in_flight.discard(task_id)
+            if record:
+                download_progress[task_id] = record
+
+    def publish_rate(self, task_id, rate):
+        with self.slots_lock:
+            slot = self.slots.get(task_id)
+            if slot is not None and self.rates is not None:
+                self.rates[slot] = int(rate)
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "running": self.executor is not None,
+                "size": self.size,
+                "submitted": self.submitted,
+                "recycled": self.recycled,
+            }
+
+    def _submit(self, job):
+        with self.lock:
+            size = app_settings["concurrent_downloads"]
+            if self.executor is not None and (self.size != size or self.submitted >= self.max_jobs * self.size):
+                self.executor.shutdown(wait=False)
+                self.executor = None
+                self.recycled += 1
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=size,
+                    mp_context=self.context,
+                    initializer=init_download_worker,
+                    initargs=(self.events, self.rates),
+                )
+                self.size = size
+                self.submitted = 0
+            self.submitted += 1
+            return self.executor.submit(run_download_job, job)
+
+    def _start_channels(self):
+        with self.lock:
+            if self.events is not None:
+                return
+            self.events = self.context.Queue()
+            self.rates = self.context.Array("d", PROCESS_RATE_SLOTS)
+            threading.Thread(target=self._drain, daemon=True).start()
+
+    def _drain(self):
+        while True:
+            task_id, record = self.events.get()
+            with self.records_lock:
+                if task_id not in self.in_flight:
+                    continue
+                download_progress[task_id] = record
+            bandwidth.observe(task_id, record.get("downloaded_bytes") or 0)
+
+
+process_pool = DownloadProcessPool(PROCESS_WORKER_MAX_JOBS)
+bandwidth.on_rate_change = process_pool.publish_rate
+
+
+class DownloadScheduler:
+    def __init__(self, size):
+        self.size = size
+        self.changed = threading.Condition(queue_lock)
+        self.running = False
+        self.workers = 0
+        self.active = 0
+
+    def start(self):
+        with self.changed:
+            self.running = True
+            self._spawn_workers()
+            self.changed.notify_all()
+
+    def stop(self):
+        with self.changed:
+            self.running = False
+
+    def resize(self, size):
+        with self.changed:
+            self.size = size
+            if self.running:
+                self._spawn_workers()
+            self.changed.notify_all()
+
+    def notify(self):
+        with self.changed:
+            self.changed.notify_all()
+
+    def get_stats(self):
+        with self.changed:
+            return {
+                "running": self.running,
+                "workers": self.workers,
+                "size": self.size,
+                "active": self.active,
+            }
+
+    def _spawn_workers(self):
+        while self.workers < self.size:
+            self.workers += 1
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def _next_item(self):
+        while True:
+            if self.workers > self.size:
+                self.workers -= 1
+                return None
+            if self.running:
+                item = download_queue.next_pending()
+                if item is not None:
+                    item["started_at"] = time.time()
+                    self.active += 1
+                    return item
+                if self.active == 0:
+                    self.running = False
+            self.changed.wait()
+
+    def _worker(self):
+        while True:
+            with self.changed:
+                item = self._next_item()
+            if item is None:
+                return
+
             task_id = item["task_id"]
             download_progress[task_id] = {
                 "status": "downloading",
@@ -635,20 +3051,33 @@ def process_queue():
                 "speed": "",
                 "title": item.get("title", "Downloading"),
             }
-            
-            thread = threading.Thread(
-                target=download_video,
-                args=(
-                    item["url"],
-                    item["format_id"],
-                    item["task_id"],
-                    item.get("audio_only", False),
-                    item.get("download_path", app.config["DOWNLOAD_FOLDER"])
-                )
-            )
-            thread.start()
-        
-        time.sleep(0.5)
+
+            try:
+                if app_settings["execution_mode"] == "process":
+                    process_pool.run(item)
+                else:
+                    download_video(
+                        item["url"],
+                        item["format_id"],
+                        task_id,
+                        item.get("audio_only", False),
+                        item.get("download_path", app.config["DOWNLOAD_FOLDER"]),
+                        item.get("connections"),
+                        item.get("rate_limit"),
+                        item.get("weight"),
+                        item.get("audio_format"),
+                        item.get("video_container"),
+                    )
+            finally:
+                with self.changed:
+                    if item.get("status") == "downloading" and task_id in download_queue:
+                        status = download_progress.get(task_id, {}).get("status")
+                        download_queue.set_status(task_id, status if status in QUEUE_STATUSES else "error")
+                    self.active -= 1
+                    self.changed.notify_all()
+
+
+scheduler = DownloadScheduler(app_settings["concurrent_downloads"])
 
 
 @app.route("/")
@@ -666,15 +3095,76 @@ def get_info():
     data = request.get_json()
     url = data.get("url", "").strip()
 
-    if not url:
-        return jsonify({"error": "Please enter a URL"}), 400
+    if not url:
+        return jsonify({"error": "Please enter a URL"}), 400
+
+    info = get_video_info(url)
+
+    if "error" in info:
+        return jsonify(info), 400
+
+    return jsonify(info)
+
+
+def get_info_key(url):
+    return get_canonical_video_id(url) or get_canonical_playlist_id(url) or get_canonical_url_key(url)
+
+
+def resolve_info(url):
+    try:
+        return get_video_info(url)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@app.route("/api/info/batch", methods=["POST"])
+def get_info_batch():
+    if not check_ytdlp():
+        return jsonify(
+            {"error": "yt-dlp is not installed. Please run: pip install yt-dlp"}
+        ), 400
+
+    data = request.get_json() or {}
+    urls = [url.strip() for url in data.get("urls") or [] if isinstance(url, str) and url.strip()]
+    if not urls:
+        return jsonify({"error": "Please enter at least one URL"}), 400
+    if len(urls) > INFO_BATCH_MAX_URLS:
+        return jsonify({"error": f"At most {INFO_BATCH_MAX_URLS} URLs per batch"}), 400
 
-    info = get_video_info(url)
+    groups = OrderedDict()
+    for index, url in enumerate(urls):
+        groups.setdefault(get_info_key(url), []).append(index)
 
-    if "error" in info:
-        return jsonify(info), 400
+    try:
+        parallelism = int(data.get("parallelism") or INFO_BATCH_PARALLELISM)
+    except (TypeError, ValueError):
+        parallelism = INFO_BATCH_PARALLELISM
+    parallelism = max(1, min(parallelism, INFO_BATCH_MAX_PARALLELISM, len(groups)))
 
-    return jsonify(info)
+    def generate():
+        extractor_pool.expand(parallelism)
+        executor = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="info")
+        futures = {executor.submit(resolve_info, urls[indexes[0]]): key for key, indexes in groups.items()}
+        failed = 0
+        try:
+            for future in as_completed(futures):
+                key = futures[future]
+                info = future.result()
+                if "error" in info:
+                    failed += len(groups[key])
+                for index in groups[key]:
+                    line = {"index": index, "url": urls[index], "key": key}
+                    if "error" in info:
+                        line["error"] = info["error"]
+                    else:
+                        line["info"] = info
+                    yield json.dumps(line) + "\n"
+            yield json.dumps({"done": True, "total": len(urls), "unique": len(groups), "failed": failed}) + "\n"
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            extractor_pool.shrink(parallelism)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
 
 
 @app.route("/api/discover", methods=["POST"])
@@ -694,12 +3184,7 @@ def start_discover():
     task_id = str(uuid.uuid4())
     
     # Store discover task
-    discover_tasks[task_id] = {
-        "url": url,
-        "max_videos": max_videos,
-        "videos": [],
-        "status": "running"
-    }
+    discover_tasks[task_id] = DiscoverTask(task_id, url, max_videos)
 
     # Start discovery in background thread
     thread = threading.Thread(
@@ -711,101 +3196,341 @@ def start_discover():
     return jsonify({"task_id": task_id, "message": "Discovery started"})
 
 
+class DiscoverTask:
+    def __init__(self, task_id, url, max_videos):
+        self.task_id = task_id
+        self.url = url
+        self.max_videos = max_videos
+        self.videos = []
+        self.updates = []
+        self.status = "running"
+        self.error = None
+        self.changed = threading.Condition()
+        self.enrichment = {}
+        self.unenriched = set()
+        self.listeners = 0
+        self.cancelled = False
+        self.cancel_timer = None
+
+    def append(self, video, enrich=False):
+        with self.changed:
+            index = len(self.videos)
+            self.videos.append(video)
+            if enrich:
+                self.unenriched.add(index)
+            self.changed.notify_all()
+        event_hub.publish("discover", self.task_id, {"type": "video", "video": video})
+        if enrich:
+            self._submit(index, video["url"])
+
+    def _submit(self, index, url):
+        with self.changed:
+            future = self.enrichment.get(index)
+            if self.cancelled or index not in self.unenriched or (future is not None and not future.done()):
+                return
+            self.enrichment[index] = discover_enricher.submit(enrich_discover_entry, self, index, url)
+
+    def enrich(self, index, info):
+        with self.changed:
+            self.unenriched.discard(index)
+            video = self.videos[index]
+            fields = {
+                key: info[key]
+                for key in ("title", "thumbnail", "duration")
+                if info.get(key) and info[key] != video.get(key)
+            }
+            if not fields:
+                return
+            video.update(fields)
+            self.updates.append(dict(fields, index=index))
+            self.changed.notify_all()
+        event_hub.publish("discover", self.task_id, {"type": "update", "index": index, **fields})
+
+    def attach(self):
+        with self.changed:
+            self.listeners += 1
+            if self.cancel_timer is not None:
+                self.cancel_timer.cancel()
+                self.cancel_timer = None
+            resume = self.cancelled and self.status == "running"
+            self.cancelled = False
+            pending = [(index, self.videos[index]["url"]) for index in sorted(self.unenriched)] if resume else []
+        # A reconnect after the grace period picks up whatever was cancelled
+        for index, url in pending:
+            self._submit(index, url)
+
+    def detach(self):
+        with self.changed:
+            self.listeners -= 1
+            if self.listeners or self.status != "running":
+                return
+            # EventSource reconnects on its own; only give up once it stays away
+            self.cancel_timer = threading.Timer(DISCOVER_CANCEL_GRACE, self._cancel_if_idle)
+            self.cancel_timer.daemon = True
+            self.cancel_timer.start()
+
+    def _cancel_if_idle(self):
+        with self.changed:
+            if self.listeners:
+                return
+            self.cancel_timer = None
+        self.cancel()
+
+    def cancel(self):
+        with self.changed:
+            self.cancelled = True
+            futures = list(self.enrichment.values())
+        for future in futures:
+            future.cancel()
+
+    def finish(self, status, error=None):
+        if status == "completed":
+            with self.changed:
+                futures = list(self.enrichment.values())
+            wait(futures)
+        else:
+            self.cancel()
+        with self.changed:
+            self.status = status
+            self.error = error
+            count = len(self.videos)
+            self.changed.notify_all()
+        job_store.mark_discover(self.task_id)
+        if error:
+            event_hub.publish("discover", self.task_id, {"status": status, "error": error})
+        else:
+            event_hub.publish("discover", self.task_id, {"status": status, "count": count})
+
+    def snapshot(self):
+        with self.changed:
+            return [dict(video) for video in self.videos], self.status, self.error
+
+    def read(self, cursor, update_cursor, timeout):
+        with self.changed:
+            if len(self.videos) <= cursor and len(self.updates) <= update_cursor and self.status == "running":
+                self.changed.wait(timeout)
+            return self.videos[cursor:], self.updates[update_cursor:], self.status, self.error
+
+
+def enrich_discover_entry(task, index, url):
+    if task.cancelled or task.task_id not in discover_tasks:
+        return
+    info = get_video_info_cli(url)
+    if task.cancelled:
+        return
+    task.enrich(index, {} if "error" in info else info)
+
+
+discover_enricher = ThreadPoolExecutor(max_workers=DISCOVER_ENRICH_WORKERS, thread_name_prefix="enrich")
+
+
 def discover_videos(url, max_videos, task_id):
+    if app_settings["extractor_mode"] == "pool":
+        discover_videos_pool(url, max_videos, task_id)
+    else:
+        discover_videos_cli(url, max_videos, task_id)
+
+
+def get_entry_thumbnail(entry):
+    if entry.get("thumbnail"):
+        return entry["thumbnail"]
+    thumbnails = [thumb for thumb in entry.get("thumbnails") or [] if thumb.get("url")]
+    return thumbnails[-1]["url"] if thumbnails else None
+
+
+def build_discover_entry(entry):
+    url = entry.get("webpage_url") or entry.get("url") or ""
+    if not url.startswith(("http://", "https://")):
+        url = f"https://www.youtube.com/watch?v={entry.get('id')}"
+    return {
+        "id": entry.get("id"),
+        "title": entry.get("title"),
+        "thumbnail": get_entry_thumbnail(entry),
+        "duration": format_duration(entry.get("duration")),
+        "url": url,
+    }
+
+
+def needs_enrichment(entry):
+    return entry.get("duration") is None or not get_entry_thumbnail(entry) or not entry.get("title")
+
+
+def discover_videos_cli(url, max_videos, task_id):
     try:
         ffmpeg_loc = get_ffmpeg_location()
         ffmpeg_arg = ["--ffmpeg-location", ffmpeg_loc] if ffmpeg_loc else []
 
         cmd = [
-            YT_DLP_EXE,
+            get_ytdlp_executable(),
             "--dump-json",
+            "--flat-playlist",
             "--yes-playlist",
             "--playlist-end", str(max_videos),
             "-q",
         ] + ffmpeg_arg + [url]
 
-        process = subprocess.Popen(
+        def on_line(line):
+            try:
+                entry = json.loads(line)
+                task = discover_tasks.get(task_id)
+                if task:
+                    task.append(build_discover_entry(entry), enrich=needs_enrichment(entry))
+
+            except:
+                pass
+
+        process = ProcessSupervisor(
             cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-            bufsize=1,
+            on_stdout_line=on_line,
+            should_stop=lambda: task_id not in discover_tasks,
         )
+        process.run()
+        
+        task = discover_tasks.get(task_id)
+        if task:
+            task.finish("completed")
 
-        for line in iter(process.stdout.readline, ''):
-            if not line:
-                break
-            
-            if task_id not in discover_tasks:
-                process.terminate()
+    except Exception as e:
+        task = discover_tasks.get(task_id)
+        if task:
+            task.finish("error", str(e))
+
+
+def discover_videos_pool(url, max_videos, task_id):
+    try:
+        info = extractor_pool.extract_info(
+            url, noplaylist=False, extract_flat="in_playlist", playlistend=int(max_videos)
+        )
+        entries = [entry for entry in (info or {}).get("entries") or [] if entry]
+        if not entries and info:
+            entries = [info]
+
+        for entry in entries:
+            task = discover_tasks.get(task_id)
+            if task is None:
                 break
-            
-            try:
-                entry = json.loads(line.strip())
-                video_info = {
-                    "id": entry.get("id"),
-                    "title": entry.get("title"),
-                    "thumbnail": entry.get("thumbnail"),
-                    "duration": format_duration(entry.get("duration")),
-                    "url": f"https://www.youtube.com/watch?v={entry.get('id')}",
-                }
-                
-                with queue_lock:
-                    if task_id in discover_tasks:
-                        discover_tasks[task_id]["videos"].append(video_info)
-                        
-            except:
-                continue
+            task.append(build_discover_entry(entry), enrich=needs_enrichment(entry))
 
-        process.wait()
-        
-        with queue_lock:
-            if task_id in discover_tasks:
-                discover_tasks[task_id]["status"] = "completed"
+        task = discover_tasks.get(task_id)
+        if task:
+            task.finish("completed")
 
     except Exception as e:
-        with queue_lock:
-            if task_id in discover_tasks:
-                discover_tasks[task_id]["status"] = "error"
-                discover_tasks[task_id]["error"] = str(e)
+        task = discover_tasks.get(task_id)
+        if task:
+            task.finish("error", str(e))
 
 
 @app.route("/api/discover/<task_id>")
 def stream_discover(task_id):
     def generate():
-        checked_indices = set()
-        while True:
-            with queue_lock:
-                if task_id not in discover_tasks:
-                    yield f"data: {json.dumps({'status': 'error', 'error': 'Task not found'})}\n\n"
-                    break
-                
-                task = discover_tasks[task_id]
-                videos = task.get("videos", [])
-                status = task.get("status", "running")
-                
-                # Send new videos
-                for i, video in enumerate(videos):
-                    if i not in checked_indices:
-                        checked_indices.add(i)
-                        yield f"data: {json.dumps({'type': 'video', 'video': video, 'count': len(videos), 'status': status})}\n\n"
-                
+        task = discover_tasks.get(task_id)
+        if task is None:
+            saved = job_store.load_discover(task_id)
+            if saved is not None:
+                task = DiscoverTask(task_id, saved["url"], len(saved["videos"]))
+                task.videos = saved["videos"]
+                task.status = saved["status"]
+                task.error = saved["error"]
+        if task is None:
+            yield f"data: {json.dumps({'status': 'error', 'error': 'Task not found'})}\n\n"
+            return
+
+        cursor = 0
+        update_cursor = 0
+        task.attach()
+        try:
+            while True:
+                videos, updates, status, error = task.read(cursor, update_cursor, EVENT_KEEPALIVE_INTERVAL)
+
+                for start in range(0, len(videos), DISCOVER_BATCH_SIZE):
+                    batch = videos[start:start + DISCOVER_BATCH_SIZE]
+                    cursor += len(batch)
+                    yield f"data: {json.dumps({'type': 'videos', 'videos': batch, 'count': cursor, 'status': status})}\n\n"
+
+                for start in range(0, len(updates), DISCOVER_BATCH_SIZE):
+                    batch = updates[start:start + DISCOVER_BATCH_SIZE]
+                    update_cursor += len(batch)
+                    yield f"data: {json.dumps({'type': 'updates', 'updates': batch})}\n\n"
+
                 if status == "completed":
-                    yield f"data: {json.dumps({'status': 'completed', 'count': len(videos)})}\n\n"
+                    yield f"data: {json.dumps({'status': 'completed', 'count': cursor})}\n\n"
                     break
-                
+
                 if status == "error":
-                    yield f"data: {json.dumps({'status': 'error', 'error': task.get('error', 'Unknown error')})}\n\n"
+                    yield f"data: {json.dumps({'status': 'error', 'error': error or 'Unknown error'})}\n\n"
                     break
 
-            import time
-            time.sleep(0.5)
+                if not videos and not updates:
+                    yield ": keepalive\n\n"
+        finally:
+            task.detach()
 
     return Response(stream_with_context(generate()), mimetype="text/event-stream")
 
 
+def start_direct_job(item):
+    direct_jobs[item["task_id"]] = item
+    job_store.mark_job(item["task_id"])
+    target = download_playlist if item["kind"] == "playlist" else download_video
+    thread = threading.Thread(
+        target=target,
+        args=(item["url"], item["format_id"], item["task_id"], item["audio_only"], item["download_path"]),
+        kwargs={
+            "connections": item.get("connections"),
+            "rate_limit": item.get("rate_limit"),
+            "weight": item.get("weight"),
+            "audio_format": item.get("audio_format"),
+            "container": item.get("video_container"),
+        },
+    )
+    thread.start()
+
+
+def restore_jobs():
+    saved_settings = job_store.load_settings()
+    for key in app_settings:
+        if key in saved_settings:
+            app_settings[key] = saved_settings[key]
+    scheduler.resize(app_settings["concurrent_downloads"])
+    connection_budget.resize(app_settings["max_connections"])
+    bandwidth.set_limit(app_settings["bandwidth_limit"])
+
+    resume_queue = False
+    resumed = 0
+    for item in job_store.load_jobs():
+        task_id = item["task_id"]
+        record = job_store.load_progress(task_id)
+
+        if item.get("kind", "queue") != "queue":
+            if record and record.get("status") in ("completed", "error"):
+                job_store.delete_job(task_id)
+                continue
+            start_direct_job(item)
+            resumed += 1
+            continue
+
+        if item.get("status") in ("downloading", "processing"):
+            item["status"] = "pending"
+        download_queue.add(item)
+        if item["status"] == "pending":
+            download_progress[task_id] = {
+                "status": "pending",
+                "progress": 0,
+                "filename": None,
+                "speed": "",
+                "title": item.get("title", "Video"),
+            }
+            resume_queue = True
+            resumed += 1
+        elif record:
+            download_progress[task_id] = record
+
+    if resume_queue:
+        scheduler.start()
+    return resumed
+
+
 @app.route("/api/download", methods=["POST"])
 def start_download():
     if not check_ytdlp():
@@ -822,75 +3547,495 @@ def start_download():
 
     if not url:
         return jsonify({"error": "Please enter a URL"}), 400
+    rate_limit, weight, error = parse_transfer_fields(data)
+    if error:
+        return jsonify({"error": error}), 400
 
     task_id = str(uuid.uuid4())
 
     if playlist_mode or "playlist" in url.lower() or "list=" in url.lower() or "/channel/" in url.lower() or "/@" in url.lower():
-        thread = threading.Thread(
-            target=download_playlist, 
-            args=(url, format_id, task_id, audio_only, download_path)
-        )
+        kind = "playlist"
     else:
-        thread = threading.Thread(
-            target=download_video, 
-            args=(url, format_id, task_id, audio_only, download_path)
-        )
-    thread.start()
+        kind = "video"
+
+    start_direct_job({
+        "task_id": task_id,
+        "kind": kind,
+        "url": url,
+        "format_id": format_id,
+        "audio_only": audio_only,
+        "download_path": download_path,
+        "connections": data.get("connections"),
+        "rate_limit": rate_limit,
+        "weight": weight,
+        "audio_format": data.get("audio_format"),
+        "video_container": data.get("video_container"),
+    })
 
     return jsonify({"task_id": task_id, "message": "Download started"})
 
 
+def format_event(event_id, channel, payload):
+    return f"id: {event_hub.cursor(event_id)}\nevent: {channel}\ndata: {json.dumps(payload)}\n\n"
+
+
+def get_event_payload(channel, key, payload):
+    if channel == "progress":
+        progress = download_progress.get(key)
+        return {"task_id": key, "data": present_progress(progress) if progress is not None else None}
+    if channel == "queue":
+        if key is None:
+            return {"task_ids": (payload or {}).get("task_ids", [])}
+        with queue_lock:
+            item = download_queue.get(key)
+            if item is None:
+                return {"task_id": key, "removed": True}
+            return {"task_id": key, "item": serialize_queue_item(item)}
+    if channel == "settings":
+        return {"settings": app_settings}
+    return {"task_id": key, **(payload or {})}
+
+
+@app.route("/api/events")
+def stream_events():
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    channels = set(filter(None, request.args.get("channels", "").split(","))) or None
+    tasks = set(filter(None, request.args.get("tasks", "").split(","))) or None
+
+    def wanted(channel, key):
+        if channels is not None and channel not in channels:
+            return False
+        return tasks is None or key is None or key in tasks
+
+    def generate():
+        after = event_hub.seq if last_event_id is None else event_hub.parse(last_event_id)
+
+        yield "retry: 2000\n\n"
+        while True:
+            seq, events, lost = event_hub.read(after, EVENT_KEEPALIVE_INTERVAL)
+            if lost:
+                yield format_event(seq, "reset", {"reason": "history expired"})
+                if channels is None or "progress" in channels:
+                    for task_id in list(download_progress):
+                        if wanted("progress", task_id):
+                            yield format_event(seq, "progress", get_event_payload("progress", task_id, None))
+                after = seq
+                continue
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+
+            latest = {}
+            for event_id, channel, key, payload in events:
+                if not wanted(channel, key):
+                    continue
+                # Events that carry their own payload (discover, queue batches) are never coalesced
+                if payload is not None:
+                    latest[(event_id,)] = (event_id, channel, key, payload)
+                else:
+                    latest.pop((channel, key), None)
+                    latest[(channel, key)] = (event_id, channel, key, payload)
+
+            for event_id, channel, key, payload in latest.values():
+                yield format_event(event_id, channel, get_event_payload(channel, key, payload))
+            after = events[-1][0]
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@app.route("/api/status/<task_id>")
+def get_status(task_id):
+    progress = download_progress.get(task_id)
+    if progress is None:
+        return jsonify({"status": "unknown"}), 404
+    return jsonify(present_progress(progress))
+
+
 @app.route("/api/progress/<task_id>")
 def get_progress(task_id):
     def generate():
-        checked_statuses = set()
+        after = event_hub.seq
         while True:
-            if task_id in download_progress:
-                progress = download_progress[task_id]
-                yield f"data: {json.dumps(progress)}\n\n"
-                if progress["status"] in ["completed", "error"]:
-                    break
-                status = progress.get("status", "")
-                if status in checked_statuses and progress.get("progress", 0) == 100:
-                    break
-                checked_statuses.add(status)
-            else:
+            progress = download_progress.get(task_id)
+            if progress is None:
                 yield f"data: {json.dumps({'status': 'unknown'})}\n\n"
                 break
-            import time
+            yield f"data: {json.dumps(present_progress(progress))}\n\n"
+            if progress["status"] in ["completed", "error"]:
+                break
 
-            time.sleep(0.5)
+            while True:
+                after, events, lost = event_hub.read(after, EVENT_KEEPALIVE_INTERVAL)
+                if lost or any(channel == "progress" and key == task_id for _, channel, key, _ in events):
+                    break
+                if not events:
+                    yield ": keepalive\n\n"
 
     return Response(stream_with_context(generate()), mimetype="text/event-stream")
 
 
+ZIP_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+ZIP_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+ZIP_END_RECORD = struct.Struct("<IHHHHIIH")
+ZIP64_END_RECORD = struct.Struct("<IQHHIIQQQQ")
+ZIP64_END_LOCATOR = struct.Struct("<IIQI")
+ZIP_LIMIT = 0xFFFFFFFF
+ZIP_FLAGS = 0x0808
+ZIP_VERSION = 20
+ZIP64_VERSION = 45
+ZIP_MADE_BY = (3 << 8) | ZIP64_VERSION
+ZIP_FILE_ATTRS = 0o100644 << 16
+
+archive_crcs = OrderedDict()
+archive_crcs_lock = threading.Lock()
+download_streams = {}
+pending_cleanups = set()
+playlist_archives = OrderedDict()
+download_streams_lock = threading.Lock()
+
+
+def get_dos_timestamp(mtime):
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return (
+        (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+        ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday,
+    )
+
+
+class PlaylistArchive:
+    def __init__(self, folder):
+        self.folder = folder
+        prefix = os.path.basename(os.path.normpath(folder))
+        self.entries = []
+        for item in sorted(os.scandir(folder), key=lambda item: item.name):
+            if not item.is_file() or item.name.startswith(".") or PARTIAL_SUFFIX.search(item.name):
+                continue
+            stat = item.stat()
+            self.entries.append({
+                "name": f"{prefix}/{item.name}".encode("utf-8"),
+                "path": item.path,
+                "size": stat.st_size,
+                "key": (item.path, stat.st_size, stat.st_mtime_ns),
+                "timestamp": get_dos_timestamp(stat.st_mtime),
+                "zip64": stat.st_size >= ZIP_LIMIT,
+            })
+
+        self.segments = []
+        offset = 0
+        for entry in self.entries:
+            entry["offset"] = offset
+            entry["version"] = ZIP64_VERSION if entry["zip64"] or offset >= ZIP_LIMIT else ZIP_VERSION
+            offset = self._add(offset, "bytes", self._local_header(entry))
+            offset = self._add(offset, "file", entry["size"], entry)
+            offset = self._add(offset, "descriptor", 24 if entry["zip64"] else 16, entry)
+        central_start = offset
+        for entry in self.entries:
+            offset = self._add(offset, "central", len(self._central_header(entry, 0)), entry)
+        offset = self._add(offset, "bytes", self._end_records(central_start, offset - central_start, offset))
+        self.size = offset
+        self.etag = hashlib.sha1(repr([entry["key"] for entry in self.entries]).encode()).hexdigest()
+
+    def _add(self, offset, kind, data, entry=None):
+        length = len(data) if kind == "bytes" else data
+        self.segments.append((offset, length, kind, data if kind == "bytes" else entry))
+        return offset + length
+
+    def _local_header(self, entry):
+        extra = struct.pack("<HHQQ", 1, 16, 0, 0) if entry["zip64"] else b""
+        size = ZIP_LIMIT if entry["zip64"] else 0
+        return ZIP_LOCAL_HEADER.pack(
+            0x04034B50, entry["version"], ZIP_FLAGS, 0,
+            *entry["timestamp"], 0, size, size, len(entry["name"]), len(extra),
+        ) + entry["name"] + extra
+
+    def _central_header(self, entry, crc):
+        fields = []
+        size = entry["size"]
+        if size >= ZIP_LIMIT:
+            fields += [size, size]
+            size = ZIP_LIMIT
+        offset = entry["offset"]
+        if offset >= ZIP_LIMIT:
+            fields.append(offset)
+            offset = ZIP_LIMIT
+        extra = struct.pack(f"<HH{len(fields)}Q", 1, 8 * len(fields), *fields) if fields else b""
+        return ZIP_CENTRAL_HEADER.pack(
+            0x02014B50, ZIP_MADE_BY, entry["version"], ZIP_FLAGS, 0,
+            *entry["timestamp"], crc, size, size, len(entry["name"]), len(extra), 0, 0, 0,
+            ZIP_FILE_ATTRS, offset,
+        ) + entry["name"] + extra
+
+    def _descriptor(self, entry, crc):
+        if entry["zip64"]:
+            return struct.pack("<IIQQ", 0x08074B50, crc, entry["size"], entry["size"])
+        return struct.pack("<IIII", 0x08074B50, crc, entry["size"], entry["size"])
+
+    def _end_records(self, central_start, central_size, end):
+        count = len(self.entries)
+        records = b""
+        if count >= 0xFFFF or central_size >= ZIP_LIMIT or central_start >= ZIP_LIMIT:
+            records += ZIP64_END_RECORD.pack(
+                0x06064B50, 44, ZIP_MADE_BY, ZIP64_VERSION, 0, 0, count, count, central_size, central_start,
+            )
+            records += ZIP64_END_LOCATOR.pack(0x07064B50, 0, end, 1)
+        return records + ZIP_END_RECORD.pack(
+            0x06054B50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+            min(central_size, ZIP_LIMIT), min(central_start, ZIP_LIMIT), 0,
+        )
+
+    def _crc(self, entry):
+        with archive_crcs_lock:
+            crc = archive_crcs.get(entry["key"])
+        if crc is None:
+            crc = 0
+            with open(entry["path"], "rb") as f:
+                for chunk in iter(lambda: f.read(PROGRESSIVE_CHUNK_SIZE), b""):
+                    crc = zlib.crc32(chunk, crc)
+            self._remember_crc(entry, crc)
+        return crc
+
+    def _remember_crc(self, entry, crc):
+        with archive_crcs_lock:
+            archive_crcs[entry["key"]] = crc
+            archive_crcs.move_to_end(entry["key"])
+            while len(archive_crcs) > ARCHIVE_CRC_CACHE_ENTRIES:
+                archive_crcs.popitem(last=False)
+
+    def _read_file(self, entry, start, end):
+        crc = 0 if start == 0 else None
+        with open(entry["path"], "rb") as f:
+            f.seek(start)
+            position = start
+            while position < end:
+                chunk = f.read(min(PROGRESSIVE_CHUNK_SIZE, end - position))
+                if not chunk:
+                    raise OSError(f"{entry['path']} shrank while being archived")
+                position += len(chunk)
+                if crc is not None:
+                    crc = zlib.crc32(chunk, crc)
+                yield chunk
+        if crc is not None and end == entry["size"]:
+            self._remember_crc(entry, crc)
+
+    def iter_bytes(self, start=0, end=None):
+        end = self.size if end is None else end
+        for offset, length, kind, data in self.segments:
+            if offset + length <= start:
+                continue
+            if offset >= end:
+                break
+            lo = max(start, offset) - offset
+            hi = min(end, offset + length) - offset
+            if kind == "file":
+                yield from self._read_file(data, lo, hi)
+            elif kind == "descriptor":
+                yield self._descriptor(data, self._crc(data))[lo:hi]
+            elif kind == "central":
+                yield self._central_header(data, self._crc(data))[lo:hi]
+            else:
+                yield data[lo:hi]
+
+
+def stream_playlist_archive(info):
+    archive = PlaylistArchive(info["folder"])
+    name = info["filename"].removeprefix("Playlist: ") or "playlist"
+    headers = {
+        "Content-Disposition": "attachment; filename*=UTF-8''" + urllib.parse.quote(f"{name}.zip"),
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{archive.etag}"',
+    }
+
+    start, end, status = 0, archive.size, 200
+    if_range = request.headers.get("If-Range")
+    if request.range and (not if_range or if_range.strip('"') == archive.etag):
+        bounds = request.range.range_for_length(archive.size)
+        if bounds is None:
+            headers["Content-Range"] = f"bytes */{archive.size}"
+            return Response(status=416, headers=headers)
+        start, end = bounds
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{archive.size}"
+    headers["Content-Length"] = str(end - start)
+    return Response(
+        stream_with_context(archive.iter_bytes(start, end)), status=status, mimetype="application/zip", headers=headers
+    )
+
+
+def open_shared(path):
+    if sys.platform != "win32":
+        return open(path, "rb")
+    # Python opens files without FILE_SHARE_DELETE on Windows, which would make
+    # yt-dlp's .part -> final rename fail while a browser is still reading
+    import ctypes
+    import msvcrt
+
+    create_file = ctypes.windll.kernel32.CreateFileW
+    create_file.restype = ctypes.c_void_p
+    handle = create_file(path, 0x80000000, 0x00000007, None, 3, 0x80, None)
+    if handle is None or handle == ctypes.c_void_p(-1).value:
+        raise ctypes.WinError()
+    return os.fdopen(msvcrt.open_osfhandle(handle, os.O_RDONLY | os.O_BINARY), "rb")
+
+
+def open_growing_file(path):
+    for candidate in (path + ".part", path):
+        try:
+            return open_shared(candidate)
+        except OSError:
+            continue
+    return None
+
+
+def follow_growing_file(task_id, path, start, end):
+    f = None
+    try:
+        while f is None:
+            status = (download_progress.get(task_id) or {}).get("status")
+            f = open_growing_file(path)
+            if f is None:
+                if status not in ("downloading", "pending"):
+                    return
+                time.sleep(PROGRESSIVE_POLL_INTERVAL)
+
+        position = start
+        f.seek(position)
+        while end is None or position < end:
+            size = end - position if end is not None else PROGRESSIVE_CHUNK_SIZE
+            chunk = f.read(min(size, PROGRESSIVE_CHUNK_SIZE))
+            if chunk:
+                position += len(chunk)
+                yield chunk
+                continue
+            status = (download_progress.get(task_id) or {}).get("status")
+            if status != "downloading" and position >= os.fstat(f.fileno()).st_size:
+                return
+            time.sleep(PROGRESSIVE_POLL_INTERVAL)
+            f.seek(position)
+    finally:
+        if f is not None:
+            f.close()
+
+
+def stream_growing_file(task_id, info):
+    path = info["stream_path"]
+    size = info.get("stream_size")
+    headers = {
+        "Content-Disposition": "attachment; filename*=UTF-8''" + urllib.parse.quote(os.path.basename(path)),
+        "Cache-Control": "no-store",
+    }
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    if not size:
+        headers["Accept-Ranges"] = "none"
+        generate = follow_growing_file(task_id, path, 0, None)
+        return Response(stream_with_context(generate), mimetype=mimetype, headers=headers)
+
+    headers["Accept-Ranges"] = "bytes"
+    start, end, status = 0, size, 200
+    if request.range:
+        bounds = request.range.range_for_length(size)
+        if bounds is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status=416, headers=headers)
+        start, end = bounds
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    headers["Content-Length"] = str(end - start)
+    generate = follow_growing_file(task_id, path, start, end)
+    return Response(stream_with_context(generate), status=status, mimetype=mimetype, headers=headers)
+
+
+def open_download_stream(task_id):
+    with download_streams_lock:
+        download_streams[task_id] = download_streams.get(task_id, 0) + 1
+
+
+def close_download_stream(task_id):
+    with download_streams_lock:
+        download_streams[task_id] -= 1
+        if download_streams[task_id]:
+            return
+        del download_streams[task_id]
+        if task_id not in pending_cleanups:
+            return
+        pending_cleanups.discard(task_id)
+    cleanup_download(task_id)
+
+
+def serve_download(task_id, info):
+    if info["status"] == "completed" and info.get("filename"):
+        filepath = get_download_filepath(info)
+        if os.path.exists(filepath):
+            return send_file(filepath, as_attachment=True, conditional=True)
+    if info["status"] == "completed" and info.get("folder") and os.path.isdir(info["folder"]):
+        return stream_playlist_archive(info)
+    elif info["status"] in ("downloading", "processing") and info.get("stream_path"):
+        return stream_growing_file(task_id, info)
+    return None
+
+
 @app.route("/download/<task_id>")
 def download_file(task_id):
-    if task_id in download_progress:
-        info = download_progress[task_id]
-        if info["status"] == "completed" and info.get("filename"):
-            filepath = os.path.join(app.config["DOWNLOAD_FOLDER"], info["filename"])
-            if os.path.exists(filepath):
-                return send_file(filepath, as_attachment=True)
+    info = download_progress.get(task_id) or playlist_archives.get(task_id)
+    if info is not None:
+        open_download_stream(task_id)
+        try:
+            response = serve_download(task_id, info)
+        except Exception:
+            close_download_stream(task_id)
+            raise
+        if response is not None:
+            # send_file bodies are passed straight to the server, which never calls
+            # Response.close; wrapping the body gets the release from whatever is iterated
+            response.response = ClosingIterator(response.response, lambda: close_download_stream(task_id))
+            return response
+        close_download_stream(task_id)
 
     return "File not found", 404
 
 
 @app.route("/api/cleanup/<task_id>", methods=["POST"])
 def cleanup(task_id):
-    if task_id in download_progress:
-        info = download_progress[task_id]
-        if info.get("filename"):
-            filepath = os.path.join(app.config["DOWNLOAD_FOLDER"], info["filename"])
-            if os.path.exists(filepath):
-                os.remove(filepath)
-        del download_progress[task_id]
-        return jsonify({"message": "Cleaned up"})
-    return jsonify({"error": "Task not found"}), 404
+    if download_progress.get(task_id) is None:
+        return jsonify({"error": "Task not found"}), 404
+    with download_streams_lock:
+        if task_id in download_streams:
+            pending_cleanups.add(task_id)
+            return jsonify({"message": "Cleanup deferred until the download finishes", "deferred": True})
+    cleanup_download(task_id)
+    return jsonify({"message": "Cleaned up"})
+
+
+def get_download_filepath(info):
+    return info.get("filepath") or os.path.join(app.config["DOWNLOAD_FOLDER"], info["filename"])
+
+
+def cleanup_download(task_id):
+    info = download_progress.get(task_id)
+    if info is None:
+        return
+    if info.get("folder") and info.get("status") == "completed":
+        # The folder stays on disk, so its ZIP must stay fetchable and resumable
+        with download_streams_lock:
+            playlist_archives[task_id] = {k: info.get(k) for k in ("status", "filename", "folder")}
+            while len(playlist_archives) > PLAYLIST_ARCHIVE_ENTRIES:
+                playlist_archives.popitem(last=False)
+    if info.get("filename"):
+        filepath = get_download_filepath(info)
+        if os.path.isfile(filepath):
+            os.remove(filepath)
+    download_progress.pop(task_id, None)
 
 
 @app.route("/api/check", methods=["GET"])
 def check_tools():
+    if request.args.get("refresh"):
+        toolchain.refresh()
     ffmpeg_ok = check_ffmpeg()
     ytdlp_ok = check_ytdlp()
 
@@ -898,6 +4043,13 @@ def check_tools():
         {
             "ffmpeg": ffmpeg_ok,
             "yt-dlp": ytdlp_ok,
+            "extractor_mode": app_settings["extractor_mode"],
+            "extractor_pool": extractor_pool.get_stats(),
+            "connections": connection_budget.get_stats(),
+            "execution_mode": app_settings["execution_mode"],
+            "process_pool": process_pool.get_stats(),
+            "postprocess_pool": postprocess_pool.get_stats(),
+            "toolchain": toolchain.get_stats(),
             "message": "All tools ready"
             if (ffmpeg_ok and ytdlp_ok)
             else "Some tools are missing",
@@ -905,6 +4057,42 @@ def check_tools():
     )
 
 
+@app.route("/api/cache", methods=["GET"])
+def get_cache_stats():
+    return jsonify(metadata_cache.get_stats())
+
+
+@app.route("/api/cache", methods=["DELETE"])
+def clear_cache():
+    metadata_cache.clear()
+    return jsonify({"message": "Cache cleared"})
+
+
+@app.route("/api/archive", methods=["GET"])
+def get_archive_stats():
+    return jsonify(download_archive.get_stats())
+
+
+@app.route("/api/archive", methods=["DELETE"])
+def clear_archive():
+    download_archive.clear()
+    return jsonify({"message": "Archive cleared"})
+
+
+@app.route("/api/partials", methods=["GET"])
+def get_partials():
+    max_age = request.args.get("max_age_hours", 0, type=float) * 3600
+    partials = collect_partials(get_partial_roots(), max_age, dry_run=True)
+    return jsonify({"partials": partials, "total_bytes": sum(item["size"] for item in partials)})
+
+
+@app.route("/api/partials", methods=["DELETE"])
+def clear_partials():
+    max_age = request.args.get("max_age_hours", app_settings["partial_max_age_hours"], type=float) * 3600
+    removed = collect_partials(get_partial_roots(), max_age)
+    return jsonify({"removed": len(removed), "freed_bytes": sum(item["size"] for item in removed)})
+
+
 @app.route("/api/settings", methods=["GET"])
 def get_settings():
     return jsonify({
@@ -912,114 +4100,341 @@ def get_settings():
         "app_download_path": app.config["DOWNLOAD_FOLDER"],
         "concurrent_downloads": app_settings["concurrent_downloads"],
         "default_quality": app_settings["default_quality"],
+        "extractor_mode": app_settings["extractor_mode"],
+        "progress_interval": app_settings["progress_interval"],
+        "partial_max_age_hours": app_settings["partial_max_age_hours"],
+        "duplicate_action": app_settings["duplicate_action"],
+        "fragment_concurrency": app_settings["fragment_concurrency"],
+        "max_connections": app_settings["max_connections"],
+        "bandwidth_limit": app_settings["bandwidth_limit"],
+        "execution_mode": app_settings["execution_mode"],
+        "audio_format": app_settings["audio_format"],
+        "video_container": app_settings["video_container"],
     })
 
 
 @app.route("/api/settings", methods=["POST"])
 def update_settings():
-    data = request.get_json()
-    if "concurrent_downloads" in data:
-        app_settings["concurrent_downloads"] = max(1, min(5, int(data["concurrent_downloads"])))
+    data = request.get_json() or {}
+    numbers = {}
+    for key, cast in SETTINGS_NUMBERS.items():
+        if key not in data:
+            continue
+        try:
+            numbers[key] = cast(data[key] or 0)
+        except (TypeError, ValueError):
+            return jsonify({"error": f"Invalid value for {key}"}), 400
+    task_rate_limits = data.get("task_rate_limits") or {}
+    if not isinstance(task_rate_limits, dict):
+        return jsonify({"error": "Invalid value for task_rate_limits"}), 400
+    try:
+        task_rate_limits = {task_id: parse_rate_limit(limit) or 0 for task_id, limit in task_rate_limits.items()}
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid value for task_rate_limits"}), 400
+
+    if "concurrent_downloads" in numbers:
+        app_settings["concurrent_downloads"] = max(1, min(5, numbers["concurrent_downloads"]))
+        scheduler.resize(app_settings["concurrent_downloads"])
     if "default_quality" in data:
         app_settings["default_quality"] = data["default_quality"]
+    if data.get("extractor_mode") in ("pool", "cli"):
+        app_settings["extractor_mode"] = data["extractor_mode"]
+    if "progress_interval" in numbers:
+        app_settings["progress_interval"] = max(0.1, min(5.0, numbers["progress_interval"]))
+    if "partial_max_age_hours" in numbers:
+        app_settings["partial_max_age_hours"] = max(0, numbers["partial_max_age_hours"])
+    if data.get("duplicate_action") in DUPLICATE_ACTIONS:
+        app_settings["duplicate_action"] = data["duplicate_action"]
+    if "fragment_concurrency" in numbers:
+        app_settings["fragment_concurrency"] = get_task_connections(numbers["fragment_concurrency"])
+    if "max_connections" in numbers:
+        app_settings["max_connections"] = max(1, min(MAX_TOTAL_CONNECTIONS, numbers["max_connections"]))
+        connection_budget.resize(app_settings["max_connections"])
+    if "bandwidth_limit" in numbers:
+        app_settings["bandwidth_limit"] = max(0, numbers["bandwidth_limit"])
+        bandwidth.set_limit(app_settings["bandwidth_limit"])
+    if data.get("execution_mode") in EXECUTION_MODES:
+        app_settings["execution_mode"] = data["execution_mode"]
+        if app_settings["execution_mode"] == "thread":
+            process_pool.shutdown()
+    if data.get("audio_format") in AUDIO_FORMATS:
+        app_settings["audio_format"] = data["audio_format"]
+    if data.get("video_container") in VIDEO_CONTAINERS:
+        app_settings["video_container"] = data["video_container"]
+    for task_id, limit in task_rate_limits.items():
+        item = download_queue.get(task_id) or direct_jobs.get(task_id)
+        if item is not None:
+            item["rate_limit"] = limit
+            job_store.mark_job(task_id)
+            queue_feed.touch(task_id)
+        bandwidth.set_task_limit(task_id, limit)
+    queue_feed.touch()
+    event_hub.publish("settings")
+    job_store.save_settings(app_settings)
     return jsonify({"message": "Settings updated", "settings": app_settings})
 
 
+def serialize_queue_item(item, usage=None):
+    task_id = item.get("task_id")
+    progress = present_progress(download_progress.get(task_id, {}) if task_id else {})
+    status = progress.get("status_text") or item.get("status", "pending")
+    return {
+        "id": item.get("task_id"),
+        "url": item.get("url"),
+        "title": item.get("title", "Unknown"),
+        "status": status,
+        "progress": progress.get("progress", 0),
+        "speed": progress.get("speed", ""),
+        "eta": progress.get("eta", ""),
+        "filename": progress.get("filename", ""),
+        "error": progress.get("error", ""),
+        "added_at": item.get("added_at", ""),
+        "rate_limit": item.get("rate_limit"),
+        "bandwidth": (usage or {}).get(task_id),
+    }
+
+
 @app.route("/api/queue", methods=["GET"])
 def get_queue():
-    queue_data = []
-    for item in download_queue:
-        task_id = item.get("task_id")
-        progress = download_progress.get(task_id, {}) if task_id else {}
-        status = progress.get("status", item.get("status", "pending"))
-        queue_data.append({
-            "id": item.get("task_id"),
-            "url": item.get("url"),
-            "title": item.get("title", "Unknown"),
-            "status": status,
-            "progress": progress.get("progress", 0),
-            "speed": progress.get("speed", ""),
-            "filename": progress.get("filename", ""),
-            "error": progress.get("error", ""),
-            "added_at": item.get("added_at", ""),
-        })
-    
-    total = len(queue_data)
-    completed = sum(1 for q in queue_data if q["status"] == "completed")
+    since = queue_feed.parse(request.args.get("since"))
+    usage = bandwidth.get_usage()
+
+    with queue_lock:
+        if since is None:
+            version = queue_feed.version
+            changed = removed = None
+        else:
+            version, changed, removed = queue_feed.since(since)
+
+        cursor = queue_feed.cursor(version)
+        etag = f'"queue-{cursor}"'
+        if request.if_none_match.contains(f"queue-{cursor}"):
+            response = Response(status=304)
+            response.headers["ETag"] = etag
+            return response
+
+        if changed is None:
+            queue_data = [serialize_queue_item(item, usage["tasks"]) for item in download_queue]
+        else:
+            queue_data = [
+                serialize_queue_item(download_queue.get(task_id), usage["tasks"])
+                for task_id in reversed(changed)
+                if task_id in download_queue
+            ]
+            removed = [task_id for task_id in removed if task_id not in download_queue]
+
+        counts = download_queue.counts()
+
+    total = sum(counts.values())
+    completed = counts["completed"]
     
-    return jsonify({
+    response = jsonify({
+        "version": cursor,
+        "full": changed is None,
         "queue": queue_data,
+        "removed": removed or [],
         "settings": app_settings,
         "total": total,
-        "pending": sum(1 for q in queue_data if q["status"] == "pending"),
-        "downloading": sum(1 for q in queue_data if "downloading" in q["status"].lower() or q["status"] == "processing"),
+        "pending": counts["pending"],
+        "downloading": counts["downloading"],
+        "processing": counts["processing"],
         "completed": completed,
-        "failed": sum(1 for q in queue_data if q["status"] == "error"),
+        "failed": counts["error"],
         "queue_progress": f"{completed}/{total}",
         "queue_percent": int((completed / total) * 100) if total > 0 else 0,
+        "bandwidth": {"limit_bps": usage["limit_bps"], "usage_bps": usage["usage_bps"]},
     })
+    response.headers["ETag"] = etag
+    return response
 
 
-@app.route("/api/queue", methods=["POST"])
-def add_to_queue():
-    data = request.get_json()
-    url = data.get("url", "").strip()
-    format_id = data.get("format_id", "best")
-    audio_only = data.get("audio_only", False)
-    download_path = data.get("download_path", app.config["DOWNLOAD_FOLDER"])
-    title = data.get("title", "Video")
-    
-    if not url:
-        return jsonify({"error": "Please enter a URL"}), 400
-    
-    task_id = str(uuid.uuid4())
-    
-    queue_item = {
-        "task_id": task_id,
+def find_queue_duplicate(url, format_id, audio_only, download_path, audio_format=None, container=None):
+    item = {
         "url": url,
         "format_id": format_id,
         "audio_only": audio_only,
         "download_path": download_path,
-        "title": title,
+        "audio_format": audio_format,
+        "video_container": container,
+    }
+    task_id = download_queue.find_active(get_queue_dedup_key(item))
+    if task_id:
+        return {"task_id": task_id, "message": "Already in queue", "duplicate": True, "reason": "queued"}
+
+    if app_settings["duplicate_action"] == "download":
+        return None
+    entry = download_archive.get(get_canonical_video_id(url), get_archive_mode(format_id, audio_only, audio_format, container))
+    if entry and os.path.abspath(os.path.dirname(entry["filepath"])) == os.path.abspath(download_path):
+        # Nothing was queued, so there is no task_id to follow
+        return {
+            "message": "Already downloaded",
+            "duplicate": True,
+            "reason": "archived",
+            "filename": os.path.basename(entry["filepath"]),
+        }
+    return None
+
+
+def parse_transfer_fields(data):
+    try:
+        return parse_rate_limit(data.get("rate_limit")), parse_weight(data.get("weight")), None
+    except (TypeError, ValueError):
+        return None, None, "rate_limit and weight must be whole numbers"
+
+
+def build_queue_item(data):
+    url = str(data.get("url") or "").strip()
+    if not url:
+        return None, "Please enter a URL"
+    rate_limit, weight, error = parse_transfer_fields(data)
+    if error:
+        return None, error
+
+    return {
+        "task_id": str(uuid.uuid4()),
+        "url": url,
+        "format_id": data.get("format_id", "best"),
+        "audio_only": data.get("audio_only", False),
+        "download_path": data.get("download_path", app.config["DOWNLOAD_FOLDER"]),
+        "title": data.get("title", "Video"),
+        "connections": data.get("connections"),
+        "rate_limit": rate_limit,
+        "weight": weight,
+        "audio_format": data.get("audio_format"),
+        "video_container": data.get("video_container"),
         "status": "pending",
         "added_at": str(uuid.uuid4()),
+    }, None
+
+
+def find_item_duplicate(item):
+    return find_queue_duplicate(
+        item["url"], item["format_id"], item["audio_only"], item["download_path"],
+        item["audio_format"], item["video_container"],
+    )
+
+
+def get_queue_progress(item):
+    return {
+        "status": "pending",
+        "progress": 0,
+        "filename": None,
+        "speed": "",
+        "title": item["title"],
     }
-    
+
+
+def create_queue_progress(item):
+    download_progress[item["task_id"]] = get_queue_progress(item)
+
+
+@app.route("/api/queue", methods=["POST"])
+def add_to_queue():
+    queue_item, error = build_queue_item(request.get_json() or {})
+    if error:
+        return jsonify({"error": error}), 400
+
     with queue_lock:
-        download_queue.append(queue_item)
-        download_progress[task_id] = {
-            "status": "pending",
-            "progress": 0,
-            "filename": None,
-            "speed": "",
-            "title": title,
-        }
+        duplicate = find_item_duplicate(queue_item)
+        if not duplicate:
+            queue_position = download_queue.add(queue_item)
+            create_queue_progress(queue_item)
+    if duplicate:
+        return jsonify(duplicate), 409 if duplicate["reason"] == "archived" else 200
+    scheduler.notify()
     
     return jsonify({
-        "task_id": task_id,
+        "task_id": queue_item["task_id"],
         "message": "Added to queue",
-        "queue_position": len(download_queue)
+        "queue_position": queue_position
+    })
+
+
+@app.route("/api/queue/bulk", methods=["POST"])
+def add_many_to_queue():
+    data = request.get_json() or {}
+    entries = data.get("items")
+    if not isinstance(entries, list) or not entries:
+        return jsonify({"error": "Please provide a list of items"}), 400
+    if len(entries) > QUEUE_BULK_MAX_ITEMS:
+        return jsonify({"error": f"At most {QUEUE_BULK_MAX_ITEMS} items per request"}), 400
+    defaults = data.get("defaults") or {}
+
+    results = []
+    candidates = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            results.append({"index": index, "error": "Item must be an object"})
+            continue
+        item, error = build_queue_item({**defaults, **entry})
+        if error:
+            results.append({"index": index, "error": error})
+            continue
+        candidates.append((index, item))
+
+    added = []
+    with queue_lock:
+        batch_keys = {}
+        for index, item in candidates:
+            dedup_key = get_queue_dedup_key(item)
+            if dedup_key in batch_keys:
+                results.append({
+                    "index": index,
+                    "task_id": batch_keys[dedup_key],
+                    "message": "Already in batch",
+                    "duplicate": True,
+                })
+                continue
+            duplicate = find_item_duplicate(item)
+            if duplicate:
+                results.append(dict(duplicate, index=index))
+                continue
+            batch_keys[dedup_key] = item["task_id"]
+            added.append(item)
+            results.append({"index": index, "task_id": item["task_id"], "message": "Added to queue"})
+
+        download_progress.set_many({item["task_id"]: get_queue_progress(item) for item in added})
+        queue_length = download_queue.add_many(added)
+    job_store.flush()
+
+    if data.get("start"):
+        scheduler.start()
+    elif added:
+        scheduler.notify()
+
+    results.sort(key=lambda result: result["index"])
+    return jsonify({
+        "results": results,
+        "added": len(added),
+        "duplicates": sum(1 for result in results if result.get("duplicate")),
+        "failed": sum(1 for result in results if "error" in result),
+        "queue_length": queue_length,
     })
 
 
+@app.route("/api/history", methods=["GET"])
+def get_history():
+    limit = max(1, min(1000, request.args.get("limit", 100, type=int)))
+    return jsonify({"history": job_store.load_history(limit)})
+
+
 @app.route("/api/queue/start", methods=["POST"])
 def start_queue():
-    threading.Thread(target=process_queue, daemon=True).start()
+    scheduler.start()
     return jsonify({"message": "Queue processing started"})
 
 
 @app.route("/api/queue/<task_id>", methods=["DELETE"])
 def remove_from_queue(task_id):
     with queue_lock:
-        for i, item in enumerate(download_queue):
-            if item.get("task_id") == task_id:
-                if item.get("status") == "downloading":
-                    return jsonify({"error": "Cannot remove downloading item"}), 400
-                download_queue.pop(i)
-                if task_id in download_progress:
-                    del download_progress[task_id]
-                return jsonify({"message": "Removed from queue"})
-    return jsonify({"error": "Item not found"}), 404
+        item = download_queue.get(task_id)
+        if item is None:
+            return jsonify({"error": "Item not found"}), 404
+        if item.get("status") in ("downloading", "processing"):
+            return jsonify({"error": "Cannot remove downloading item"}), 400
+        download_queue.remove(task_id)
+        download_progress.pop(task_id, None)
+    return jsonify({"message": "Removed from queue"})
 
 
 @app.route("/api/queue/clear", methods=["POST"])
@@ -1032,20 +4447,18 @@ def clear_queue():
             download_queue.clear()
             download_progress.clear()
         elif clear_type == "completed":
-            download_queue[:] = [item for item in download_queue if item.get("status") != "completed"]
+            download_queue.clear(["completed"])
         elif clear_type == "failed":
-            download_queue[:] = [item for item in download_queue if item.get("status") != "error"]
+            download_queue.clear(["error"])
         elif clear_type == "pending":
-            download_queue[:] = [item for item in download_queue if item.get("status") == "pending"]
+            download_queue.clear(["pending"])
     
     return jsonify({"message": f"Cleared {clear_type} items from queue"})
 
 
 @app.route("/api/queue/stop", methods=["POST"])
 def stop_queue():
-    global processing_queue
-    with queue_lock:
-        processing_queue = False
+    scheduler.stop()
     return jsonify({"message": "Queue processing stopped"})
 
 
@@ -1055,6 +4468,7 @@ if __name__ == "__main__":
     print("  Open: http://localhost:5000")
     print("=" * 50)
 
+    toolchain.refresh()
     ffmpeg_ok = check_ffmpeg()
     ytdlp_ok = check_ytdlp()
 
@@ -1073,5 +4487,17 @@ if __name__ == "__main__":
 
     print("=" * 50)
 
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    debug = True
+
+    # The reloader imports this module in a watcher process and again in the
+    # serving child; only the child may resume jobs and start background work
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        threading.Thread(target=extractor_pool.warm, daemon=True).start()
+        threading.Thread(target=run_partial_gc, daemon=True).start()
+
+        resumed = restore_jobs()
+        if resumed:
+            print(f"\n  Resumed {resumed} interrupted download(s)")
+
+    app.run(debug=debug, host="0.0.0.0", port=5000)
   
\ No newline at end of file
@@ -0,0 +1,219 @@
+import argparse
+import http.server
+import os
+import statistics
+import tempfile
+import threading
+import time
+from functools import partial
+
+import app
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    rate = None
+    chunk_size = 16 * 1024
+
+    def log_message(self, *args):
+        pass
+
+    def copyfile(self, source, outputfile):
+        if not self.rate:
+            return super().copyfile(source, outputfile)
+        while True:
+            chunk = source.read(self.chunk_size)
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            time.sleep(len(chunk) / self.rate)
+
+
+class QuietServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+def start_media_server(directory, rate=None):
+    handler = type("ThrottledHandler", (QuietHandler,), {"rate": rate})
+    handler = partial(handler, directory=directory)
+    server = QuietServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def create_sample_media(directory, name="sample.mp4", size=1024 * 1024):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return path
+
+
+def create_sample_hls(directory, segments, segment_size):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:2", "#EXT-X-MEDIA-SEQUENCE:0"]
+    for index in range(segments):
+        name = f"segment{index:04d}.ts"
+        create_sample_media(directory, name, segment_size)
+        lines += ["#EXTINF:2.0,", name]
+    lines.append("#EXT-X-ENDLIST")
+    with open(os.path.join(directory, "stream.m3u8"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def wait_for_task(task_id, timeout=600):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if app.download_progress[task_id]["status"] in ("completed", "error"):
+            return
+        time.sleep(0.05)
+
+
+def summarize(label, timings):
+    print(
+        f"  {label:<12} runs={len(timings):<3} "
+        f"min={min(timings) * 1000:8.1f}ms "
+        f"median={statistics.median(timings) * 1000:8.1f}ms "
+        f"mean={statistics.mean(timings) * 1000:8.1f}ms"
+    )
+
+
+def time_calls(func, url, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func(url)
+        timings.append(time.perf_counter() - start)
+        if "error" in result:
+            print(f"  error: {result['error'].strip()[:200]}")
+            break
+    return timings
+
+
+def bench_info(args):
+    url = args.url
+    server = None
+    workdir = None
+    if not url:
+        workdir = tempfile.TemporaryDirectory()
+        create_sample_media(workdir.name)
+        server = start_media_server(workdir.name)
+        url = f"http://127.0.0.1:{server.server_address[1]}/sample.mp4"
+
+    print(f"Info lookup latency for {url}")
+
+    if app.check_ytdlp():
+        summarize("cold spawn", time_calls(app.fetch_video_info_cli, url, args.runs))
+    else:
+        print("  cold spawn   skipped (yt-dlp executable not on PATH)")
+
+    app.extractor_pool.warm()
+    summarize("warm pool", time_calls(app.fetch_video_info_pool, url, args.runs))
+
+    if server:
+        server.shutdown()
+        workdir.cleanup()
+
+
+def bench_playlist(args):
+    workdir = tempfile.TemporaryDirectory()
+    media_dir = os.path.join(workdir.name, "media")
+    os.makedirs(media_dir)
+    for index in range(args.entries):
+        create_sample_media(media_dir, f"video{index:03d}.mp4", args.size)
+    server = start_media_server(media_dir, rate=args.rate)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    entries = [
+        {"id": f"video{index:03d}", "title": f"video{index:03d}", "url": f"{base_url}/video{index:03d}.mp4"}
+        for index in range(args.entries)
+    ]
+    app.probe_playlist = lambda url: {"title": "benchmark", "entries": entries}
+    app.check_ffmpeg = lambda: True
+    app.app_settings["duplicate_action"] = "download"
+
+    print(
+        f"Playlist wall-clock for {args.entries} entries x {args.size // 1024} KiB "
+        f"at {args.rate // 1024} KiB/s per connection"
+    )
+    for concurrent in args.concurrent:
+        output_dir = os.path.join(workdir.name, f"out{concurrent}")
+        task_id = f"bench-{concurrent}"
+        start = time.perf_counter()
+        app.download_playlist(f"{base_url}/playlist", "best", task_id, False, output_dir, concurrent)
+        elapsed = time.perf_counter() - start
+        progress = app.download_progress[task_id]
+        print(
+            f"  concurrent={concurrent:<3} {elapsed:8.2f}s "
+            f"status={progress['status']} failed={progress.get('failed_videos', 0)}"
+        )
+
+    server.shutdown()
+    workdir.cleanup()
+
+
+def bench_segments(args):
+    workdir = tempfile.TemporaryDirectory()
+    media_dir = os.path.join(workdir.name, "media")
+    os.makedirs(media_dir)
+    create_sample_hls(media_dir, args.segments, args.size)
+    server = start_media_server(media_dir, rate=args.rate)
+    url = f"http://127.0.0.1:{server.server_address[1]}/stream.m3u8"
+    app.check_ffmpeg = lambda: True
+    app.app_settings["duplicate_action"] = "download"
+    app.connection_budget.resize(max(args.connections))
+    total_bytes = args.segments * args.size
+
+    print(
+        f"HLS throughput for {args.segments} segments x {args.size // 1024} KiB "
+        f"at {args.rate // 1024} KiB/s per connection, timed until the task completes"
+    )
+    for connections in args.connections:
+        output_dir = os.path.join(workdir.name, f"out{connections}")
+        task_id = f"bench-{connections}"
+        start = time.perf_counter()
+        app.download_video(url, "best", task_id, False, output_dir, connections)
+        transfer = time.perf_counter() - start
+        # download_video returns once fixups are handed to the post-process pool
+        wait_for_task(task_id)
+        elapsed = time.perf_counter() - start
+        progress = app.download_progress[task_id]
+        print(
+            f"  connections={connections:<3} {elapsed:8.2f}s "
+            f"{total_bytes / elapsed / 1024 / 1024:8.2f} MiB/s "
+            f"(transfer {transfer:.2f}s) status={progress['status']}"
+        )
+
+    server.shutdown()
+    workdir.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zen Downloader benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    info_parser = subparsers.add_parser("info", help="Compare cold-spawn and warm-pool info lookups")
+    info_parser.add_argument("--url", help="URL to resolve (defaults to a local stand-in media server)")
+    info_parser.add_argument("--runs", type=int, default=5)
+    info_parser.set_defaults(func=bench_info)
+
+    playlist_parser = subparsers.add_parser("playlist", help="Playlist wall-clock time by worker count")
+    playlist_parser.add_argument("--entries", type=int, default=100)
+    playlist_parser.add_argument("--size", type=int, default=256 * 1024, help="Bytes per entry")
+    playlist_parser.add_argument("--rate", type=int, default=1024 * 1024, help="Bytes/s per connection")
+    playlist_parser.add_argument("--concurrent", type=int, nargs="+", default=[1, 3, 6])
+    playlist_parser.set_defaults(func=bench_playlist)
+
+    segments_parser = subparsers.add_parser("segments", help="HLS throughput by fragment connection count")
+    segments_parser.add_argument("--segments", type=int, default=40)
+    segments_parser.add_argument("--size", type=int, default=128 * 1024, help="Bytes per segment")
+    segments_parser.add_argument("--rate", type=int, default=512 * 1024, help="Bytes/s per connection")
+    segments_parser.add_argument("--connections", type=int, nargs="+", default=[1, 2, 4, 8])
+    segments_parser.set_defaults(func=bench_segments)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
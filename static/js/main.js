@@ -1,7 +1,10 @@
 let currentVideoInfo = null;
 let selectedFormat = 'best';
 let currentTaskId = null;
-let eventSource = null;
+let eventStream = null;
+const progressHandlers = new Map();
+let queueReloadTimer = null;
+let queueRenderTimer = null;
 let appSettings = null;
 
 async function loadSettings() {
@@ -226,14 +229,76 @@ async function startDownload() {
     }
 }
 
+function connectEvents() {
+    if (eventStream) return;
+    
+    // One multiplexed stream for every task; the browser resumes it with Last-Event-ID
+    eventStream = new EventSource('/api/events');
+    
+    eventStream.addEventListener('progress', function(event) {
+        const message = JSON.parse(event.data);
+        const handler = progressHandlers.get(message.task_id);
+        if (handler && message.data) handler(message.data);
+        applyQueueProgress(message.task_id, message.data);
+    });
+    eventStream.addEventListener('queue', scheduleQueueReload);
+    eventStream.addEventListener('settings', scheduleQueueReload);
+    eventStream.addEventListener('reset', function() {
+        queueVersion = null;
+        scheduleQueueReload();
+    });
+}
+
+// Progress events carry everything a queue row shows, so they update it in place;
+// only queue membership and status changes go back to the server
+function applyQueueProgress(taskId, progress) {
+    const item = queueItems.get(taskId);
+    if (!item || !progress) return;
+    item.status = progress.status_text || item.status;
+    item.progress = progress.progress || 0;
+    item.speed = progress.speed || '';
+    item.eta = progress.eta || '';
+    item.filename = progress.filename || item.filename;
+    item.error = progress.error || item.error;
+    if (queueRenderTimer) return;
+    queueRenderTimer = setTimeout(() => {
+        queueRenderTimer = null;
+        renderQueueItems(Array.from(queueItems.values()));
+    }, 100);
+}
+
+function scheduleQueueReload() {
+    if (queueReloadTimer) return;
+    queueReloadTimer = setTimeout(() => {
+        queueReloadTimer = null;
+        loadQueue();
+    }, 100);
+}
+
+function saveFromUrl(url, filename) {
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = filename;
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
+}
+
 function startProgressTracking(taskId) {
-    eventSource = new EventSource(`/api/progress/${taskId}`);
+    connectEvents();
+    let streaming = false;
     
-    eventSource.onmessage = function(event) {
-        const progress = JSON.parse(event.data);
+    const handleProgress = function(progress) {
+        if (!progressHandlers.has(taskId)) return;
+        
+        // Single-file downloads can be saved while they are still arriving on the server
+        if (!streaming && progress.status === 'downloading' && progress.stream_path) {
+            streaming = true;
+            saveFromUrl(`/download/${taskId}`, progress.stream_path.split(/[\\/]/).pop());
+        }
         
         if (progress.status === 'completed') {
-            eventSource.close();
+            progressHandlers.delete(taskId);
             document.getElementById('inlineProgress').classList.add('hidden');
             document.getElementById('progressBar').style.width = '0%';
             document.getElementById('progressPercent').textContent = '0%';
@@ -244,7 +309,12 @@ function startProgressTracking(taskId) {
             
             // For playlist downloads, show a success message instead of auto-downloading
             if (filename.startsWith('Playlist:')) {
-                alert('Playlist download completed! Files saved to your selected folder.');
+                if (confirm('Playlist download completed! Files saved to your selected folder.\n\nAlso download them as a ZIP?')) {
+                    saveFromUrl(`/download/${taskId}`, filename.replace('Playlist: ', '') + '.zip');
+                }
+                // Keep the task so the ZIP request (and any resume of it) can still find the folder
+                resetApp(true);
+            } else if (streaming) {
                 resetApp();
             } else {
                 fetch(`/download/${currentTaskId}`)
@@ -254,12 +324,7 @@ function startProgressTracking(taskId) {
                     })
                     .then(blob => {
                         const url = window.URL.createObjectURL(blob);
-                        const a = document.createElement('a');
-                        a.href = url;
-                        a.download = filename;
-                        document.body.appendChild(a);
-                        a.click();
-                        document.body.removeChild(a);
+                        saveFromUrl(url, filename);
                         window.URL.revokeObjectURL(url);
                         resetApp();
                     })
@@ -269,7 +334,7 @@ function startProgressTracking(taskId) {
                     });
             }
         } else if (progress.status === 'error') {
-            eventSource.close();
+            progressHandlers.delete(taskId);
             document.getElementById('inlineProgress').classList.add('hidden');
             showError(progress.error || 'Download failed');
         } else if (progress.progress !== undefined) {
@@ -277,9 +342,18 @@ function startProgressTracking(taskId) {
             if (progress.current_video && progress.total_videos) {
                 progressText = `Video ${progress.current_video}/${progress.total_videos} - ${progress.progress}%`;
             }
-            updateProgressBar(progress.progress, progress.speed, progressText);
+            const speedText = progress.eta ? `${progress.speed} · ETA ${progress.eta}` : progress.speed;
+            updateProgressBar(progress.progress, speedText, progressText);
         }
     };
+    
+    progressHandlers.set(taskId, handleProgress);
+    
+    // Catch up on anything that happened before the handler was registered
+    fetch(`/api/status/${taskId}`)
+        .then(response => response.ok ? response.json() : null)
+        .then(progress => { if (progress) handleProgress(progress); })
+        .catch(() => {});
 }
 
 function updateProgressBar(percent, speed, customText) {
@@ -299,21 +373,20 @@ function showError(message) {
     document.getElementById('inlineProgress').classList.add('hidden');
 }
 
-async function resetApp() {
-    if (currentTaskId) {
+async function resetApp(keepTask = false) {
+    if (currentTaskId && !keepTask) {
         try {
             await fetch(`/api/cleanup/${currentTaskId}`, { method: 'POST' });
         } catch (e) {}
     }
     
-    if (eventSource) {
-        eventSource.close();
+    if (currentTaskId) {
+        progressHandlers.delete(currentTaskId);
     }
     
     currentVideoInfo = null;
     selectedFormat = 'best';
     currentTaskId = null;
-    eventSource = null;
     
     document.getElementById('urlInput').value = '';
     document.getElementById('audioOnly').checked = false;
@@ -344,7 +417,9 @@ document.getElementById('urlInput').addEventListener('keypress', function(e) {
 });
 
 // Queue Management
-let queueRefreshInterval = null;
+let queueVersion = null;
+let queueEtag = null;
+let queueItems = new Map();
 
 function toggleQueue() {
     const content = document.getElementById('queueContent');
@@ -355,9 +430,24 @@ function toggleQueue() {
 
 async function loadQueue() {
     try {
-        const response = await fetch('/api/queue');
+        const headers = {};
+        let endpoint = '/api/queue';
+        if (queueVersion !== null) {
+            endpoint += `?since=${queueVersion}`;
+            if (queueEtag) headers['If-None-Match'] = queueEtag;
+        }
+        
+        const response = await fetch(endpoint, { headers, cache: 'no-store' });
+        if (response.status === 304) return;
+        
         const data = await response.json();
         
+        if (data.full) queueItems = new Map();
+        data.removed.forEach(id => queueItems.delete(id));
+        data.queue.forEach(item => queueItems.set(item.id, item));
+        queueVersion = data.version;
+        queueEtag = response.headers.get('ETag');
+        
         const queueCount = document.getElementById('queueCount');
         const queueStats = document.getElementById('queueStats');
         const startQueueBtn = document.getElementById('startQueueBtn');
@@ -402,7 +492,7 @@ async function loadQueue() {
             queueEmpty.classList.add('hidden');
             queueList.classList.remove('hidden');
             
-            renderQueueItems(data.queue);
+            renderQueueItems(Array.from(queueItems.values()));
             
             // Expand queue if downloading
             if (data.downloading > 0) {
@@ -515,6 +605,10 @@ async function addToQueue() {
             showError(data.error);
             return;
         }
+        if (data.reason === 'archived') {
+            showError(`Already downloaded: ${data.filename}`);
+            return;
+        }
         
         loadQueue();
         
@@ -546,28 +640,16 @@ function addPlaylistToQueue() {
         return;
     }
     
-    videos.forEach((video, idx) => {
-        const videoUrl = `https://www.youtube.com/watch?v=${video.id}`;
-        
-        fetch('/api/queue', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                url: videoUrl,
-                format_id: quality,
-                audio_only: audioOnly,
-                download_path: downloadPath,
-                title: video.title
-            })
-        });
-    });
+    const items = videos.map(video => ({
+        url: `https://www.youtube.com/watch?v=${video.id}`,
+        title: video.title
+    }));
     
-    // Expand queue and refresh
-    setTimeout(() => {
-        loadQueue();
-        document.getElementById('queueContent').classList.remove('hidden');
-        document.getElementById('queueToggle').classList.remove('rotate-180');
-    }, 500);
+    addManyToQueue(items, {
+        format_id: quality,
+        audio_only: audioOnly,
+        download_path: downloadPath
+    }).catch(() => showError('Failed to add playlist to queue'));
 }
 
 function addAllToQueue() {
@@ -578,9 +660,9 @@ async function startQueue() {
     try {
         await fetch('/api/queue/start', { method: 'POST' });
         
-        // Start polling for updates - more frequently when downloading
-        if (queueRefreshInterval) clearInterval(queueRefreshInterval);
-        queueRefreshInterval = setInterval(loadQueue, 500);
+        // Updates are pushed over the event stream; loadQueue only fetches deltas
+        connectEvents();
+        loadQueue();
         
     } catch (err) {
         showError('Failed to start queue');
@@ -607,7 +689,6 @@ async function clearAllQueue() {
 async function stopQueue() {
     try {
         await fetch('/api/queue/stop', { method: 'POST' });
-        if (queueRefreshInterval) clearInterval(queueRefreshInterval);
         loadQueue();
     } catch (err) {
         console.error('Failed to stop queue:', err);
@@ -661,6 +742,8 @@ function showSettings() {
     document.getElementById('concurrentDownloads').value = appSettings?.concurrent_downloads || 1;
     document.getElementById('concurrentLabel').textContent = appSettings?.concurrent_downloads || 1;
     document.getElementById('defaultQuality').value = appSettings?.default_quality || 'best';
+    document.getElementById('audioFormat').value = appSettings?.audio_format || 'mp3';
+    document.getElementById('videoContainer').value = appSettings?.video_container || 'mp4';
 }
 
 function hideSettings() {
@@ -675,6 +758,8 @@ function updateConcurrentLabel(value) {
 async function saveSettings() {
     const concurrent = document.getElementById('concurrentDownloads').value;
     const quality = document.getElementById('defaultQuality').value;
+    const audioFormat = document.getElementById('audioFormat').value;
+    const videoContainer = document.getElementById('videoContainer').value;
     
     try {
         const response = await fetch('/api/settings', {
@@ -682,7 +767,9 @@ async function saveSettings() {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 concurrent_downloads: concurrent,
-                default_quality: quality
+                default_quality: quality,
+                audio_format: audioFormat,
+                video_container: videoContainer
             })
         });
         
@@ -699,6 +786,7 @@ async function saveSettings() {
 document.addEventListener('DOMContentLoaded', () => {
     loadSettings();
     loadQueue();
+    connectEvents();
 });
 
 // Discovery Functions
@@ -748,14 +836,22 @@ async function discoverVideos() {
         discoverEventSource.onmessage = function(event) {
             const result = JSON.parse(event.data);
             
-            if (result.type === 'video') {
-                // New video discovered
-                discoveredVideos.push(result.video);
-                addDiscoveredVideo(result.video, discoveredVideos.length);
+            if (result.type === 'video' || result.type === 'videos') {
+                // New videos discovered, possibly batched into one message
+                const videos = result.type === 'videos' ? result.videos : [result.video];
+                videos.forEach(video => {
+                    discoveredVideos.push(video);
+                    addDiscoveredVideo(video, discoveredVideos.length);
+                });
                 document.getElementById('discoverCount').textContent = discoveredVideos.length;
                 document.getElementById('discoverStatus').textContent = `Found ${discoveredVideos.length} videos`;
             }
             
+            if (result.type === 'updates') {
+                // Details filled in by background enrichment after the flat listing
+                result.updates.forEach(update => updateDiscoveredVideo(update));
+            }
+            
             if (result.status === 'completed') {
                 document.getElementById('discoverProgress').classList.add('hidden');
                 document.getElementById('discoverStatus').textContent = `Discovery complete! Found ${result.count} videos`;
@@ -791,16 +887,30 @@ function addDiscoveredVideo(video, index) {
     div.innerHTML = `
         <input type="checkbox" class="w-5 h-5 accent-cyan-400" checked>
         <span class="text-gray-500 text-sm w-6">${index}</span>
-        <img src="${video.thumbnail}" class="w-24 h-14 object-cover rounded" alt="${video.title}">
+        <img src="${video.thumbnail || ''}" class="discover-thumb w-24 h-14 object-cover rounded" alt="${video.title}">
         <div class="flex-1 min-w-0">
-            <div class="font-semibold truncate text-sm">${video.title}</div>
-            <div class="text-xs text-gray-400">${video.duration}</div>
+            <div class="discover-title font-semibold truncate text-sm">${video.title}</div>
+            <div class="discover-duration text-xs text-gray-400">${video.duration}</div>
         </div>
     `;
     
     list.appendChild(div);
 }
 
+function updateDiscoveredVideo(update) {
+    const video = discoveredVideos[update.index];
+    const div = document.querySelector(`#discoveredList .video-card[data-index="${update.index}"]`);
+    if (!video || !div) return;
+    Object.assign(video, update);
+    
+    if (update.thumbnail) div.querySelector('.discover-thumb').src = update.thumbnail;
+    if (update.duration) div.querySelector('.discover-duration').textContent = update.duration;
+    if (update.title) {
+        div.dataset.title = update.title;
+        div.querySelector('.discover-title').textContent = update.title;
+    }
+}
+
 function selectAllDiscovered() {
     document.querySelectorAll('#discoveredList input[type="checkbox"]').forEach(cb => cb.checked = true);
 }
@@ -830,30 +940,33 @@ async function addSelectedToQueue() {
     const audioOnly = document.getElementById('discoverAudioOnly').checked;
     const downloadPath = document.getElementById('downloadPath').value;
     
-    let addedCount = 0;
-    for (const video of selectedVideos) {
-        try {
-            await fetch('/api/queue', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    url: video.url,
-                    format_id: quality,
-                    audio_only: audioOnly,
-                    download_path: downloadPath,
-                    title: video.title
-                })
-            });
-            addedCount++;
-        } catch (err) {
-            console.error('Failed to add video to queue:', err);
-        }
+    try {
+        const data = await addManyToQueue(selectedVideos, {
+            format_id: quality,
+            audio_only: audioOnly,
+            download_path: downloadPath
+        });
+        alert(`Added ${data.added} videos to queue!` + (data.duplicates ? ` (${data.duplicates} already queued or downloaded)` : ''));
+    } catch (err) {
+        showError('Failed to add videos to queue');
     }
+}
+
+async function addManyToQueue(items, defaults) {
+    const response = await fetch('/api/queue/bulk', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ items, defaults })
+    });
+    const data = await response.json();
+    if (data.error) throw new Error(data.error);
+    data.results.filter(result => result.error).forEach(result => {
+        console.error('Failed to add video to queue:', items[result.index], result.error);
+    });
     
     // Refresh queue and show it
     loadQueue();
     document.getElementById('queueContent').classList.remove('hidden');
     document.getElementById('queueToggle').classList.remove('rotate-180');
-    
-    alert(`Added ${addedCount} videos to queue!`);
+    return data;
 }